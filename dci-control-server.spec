@@ -31,6 +31,7 @@ BuildRequires:  python-flask
 BuildRequires:  python-flask-sqlalchemy
 BuildRequires:  python-lxml
 BuildRequires:  python-passlib
+BuildRequires:  python-prometheus_client
 BuildRequires:  python-psycopg2
 BuildRequires:  python-requests
 BuildRequires:  python-rpm-macros
@@ -54,6 +55,7 @@ Requires:       python-flask
 Requires:       python-flask-sqlalchemy
 Requires:       python-lxml
 Requires:       python-passlib
+Requires:       python-prometheus_client
 Requires:       python-psycopg2
 Requires:       python-requests
 Requires:       python-six
@@ -87,6 +89,7 @@ BuildRequires:  python3-flask
 BuildRequires:  python3-flask-sqlalchemy
 BuildRequires:  python3-lxml
 BuildRequires:  python3-passlib
+BuildRequires:  python3-prometheus_client
 BuildRequires:  python3-psycopg2
 BuildRequires:  python3-pytest
 BuildRequires:  python3-requests
@@ -108,6 +111,7 @@ Requires:       python3-flask
 Requires:       python3-flask-sqlalchemy
 Requires:       python3-lxml
 Requires:       python3-passlib
+Requires:       python3-prometheus_client
 Requires:       python3-psycopg2
 Requires:       python3-pytz
 Requires:       python3-requests
@@ -0,0 +1,47 @@
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""add created_at id indexes
+
+Revision ID: 1bb42ff54435
+Revises: 8e1349eb050b
+Create Date: 2017-11-20 10:12:31.842117
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1bb42ff54435'
+down_revision = '8e1349eb050b'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+_INDEXES = (
+    ('jobs_created_at_id_idx', 'jobs'),
+    ('jobstates_created_at_id_idx', 'jobstates'),
+    ('files_created_at_id_idx', 'files'),
+    ('logs_created_at_id_idx', 'logs'),
+)
+
+
+def upgrade():
+    for name, table in _INDEXES:
+        op.create_index(name, table, ['created_at', 'id'])
+
+
+def downgrade():
+    for name, table in _INDEXES:
+        op.drop_index(name, table)
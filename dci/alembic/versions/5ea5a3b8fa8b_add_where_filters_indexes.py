@@ -0,0 +1,42 @@
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""add where filters indexes
+
+Revision ID: 5ea5a3b8fa8b
+Revises: 1bb42ff54435
+Create Date: 2017-11-27 14:36:08.519204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5ea5a3b8fa8b'
+down_revision = '1bb42ff54435'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('jobs_status_created_at_idx', 'jobs',
+                    ['status', 'created_at'])
+    op.create_index('components_name_pattern_idx', 'components', ['name'],
+                    postgresql_ops={'name': 'text_pattern_ops'})
+
+
+def downgrade():
+    op.drop_index('components_name_pattern_idx', 'components')
+    op.drop_index('jobs_status_created_at_idx', 'jobs')
@@ -41,8 +41,14 @@ def get_logs(user):
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
 
-    nb_rows = query.get_number_of_rows()
+    if query.can_stream():
+        return v1_utils.stream_result(query, 'audits', _TABLE.name,
+                                      args['embed'], None)
+
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'], None)
 
-    return flask.jsonify({'audits': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'audits': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
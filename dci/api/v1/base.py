@@ -31,7 +31,8 @@ def get_resource_by_id(user, resource, table, embed_many, ignore_columns=None,
     resource_id = resource['id']
     columns = v1_utils.get_columns_name_with_objects(table)
 
-    query = v1_utils.QueryBuilder(table, args, columns, ignore_columns)
+    query = v1_utils.QueryBuilder(table, args, columns, ignore_columns,
+                                  embed_many=embed_many)
 
     if (not user.is_super_admin() and 'team_id' in resource and
             resource['team_id'] is not None):
@@ -49,6 +50,11 @@ def get_resource_by_id(user, resource, table, embed_many, ignore_columns=None,
         raise dci_exc.DCINotFound(resource_name, resource_id)
     resource = rows[0]
 
+    # the etag of the resource does not change with its embeds
+    if ('etag' in resource and not args['embed'] and
+            flask.request.if_none_match.contains_weak(resource['etag'])):
+        return flask.Response(None, 304, headers={'ETag': resource['etag']})
+
     res = flask.jsonify({resource_name: resource})
 
     if 'etag' in resource:
@@ -64,6 +70,13 @@ def get_to_purge_archived_resources(user, table):
         table.c.state == 'archived'
     )
     query = sql.select([table]).where(where_clause)
+
+    size = flask.current_app.config.get('STREAM_BATCH_SIZE')
+    if size:
+        return v1_utils.stream_json(table.name,
+                                    v1_utils.fetch_batches(query, size),
+                                    lambda count: {'count': count})
+
     result = flask.g.db_conn.execute(query).fetchall()
 
     return flask.jsonify({table.name: result,
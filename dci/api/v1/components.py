@@ -105,23 +105,35 @@ def get_all_components(user, topic_id):
     if str(topic_id) not in v1_utils.user_topic_ids(user):
         raise auth.UNAUTHORIZED
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _C_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _C_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     query.add_extra_condition(sql.and_(
         _TABLE.c.topic_id == topic_id,
         _TABLE.c.state != 'archived'))
 
-    nb_rows = query.get_number_of_rows()
+    etag = query.get_etag(user.id)
+    response = v1_utils.not_modified(etag)
+    if response is not None:
+        return response
+
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
+    # the page is complete before the filtering below
+    next_cursor = query.next_cursor(rows)
 
     # Return only the component which have the export_control flag set to true
     #
     if not (auth.is_admin(user)):
         rows = [row for row in rows if row['export_control']]
 
-    return flask.jsonify({'components': rows, '_meta': {'count': nb_rows}})
+    return v1_utils.with_etag(
+        flask.jsonify({'components': rows,
+                       '_meta': {'count': nb_rows,
+                                 'next': next_cursor}}),
+        etag)
 
 
 @api.route('/components/<uuid:c_id>', methods=['GET'])
@@ -183,9 +195,8 @@ def list_components_files(user, c_id):
     query = v1_utils.QueryBuilder(models.COMPONENTFILES, args, _CF_COLUMNS)
     query.add_extra_condition(models.COMPONENTFILES.c.component_id == c_id)
 
-    nb_rows = query.get_number_of_rows(models.COMPONENTFILES,
-                                       models.COMPONENTFILES.c.component_id == c_id)  # noqa
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, models.COMPONENTFILES.name, None, None)
 
     return flask.jsonify({'component_files': rows,
@@ -238,6 +249,7 @@ def download_component_file(user, c_id, f_id):
 
 @api.route('/components/<uuid:c_id>/files', methods=['POST'])
 @decorators.login_required
+@decorators.streamed_payload
 @decorators.has_role(['SUPER_ADMIN', 'PRODUCT_OWNER', 'FEEDER'])
 def upload_component_file(user, c_id):
     COMPONENT_FILES = models.COMPONENT_FILES
@@ -253,6 +265,7 @@ def upload_component_file(user, c_id):
 
     content = files.get_stream_or_content_from_request(flask.request)
     swift.upload(file_path, content)
+    files.verify_streamed_payload(lambda: swift.delete(file_path))
     s_file = swift.head(file_path)
 
     values = dict.fromkeys(['md5', 'mime', 'component_id', 'name'])
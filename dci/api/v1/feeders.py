@@ -76,7 +76,8 @@ def create_feeders(user):
 def get_all_feeders(user):
     args = schemas.args(flask.request.args.to_dict())
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _F_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _F_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
@@ -84,10 +85,13 @@ def get_all_feeders(user):
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'feeders': rows, '_meta': {'count': len(rows)}})
+    return flask.jsonify({'feeders': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 @api.route('/feeders/<uuid:f_id>', methods=['GET'])
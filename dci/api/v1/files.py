@@ -37,7 +37,6 @@ from dci.stores import files
 
 _TABLE = models.FILES
 # associate column names with the corresponding SA Column object
-_FILES_FOLDER = dci_config.generate_conf()['FILES_UPLOAD_FOLDER']
 _VALID_EMBED = embeds.files()
 _FILES_COLUMNS = v1_utils.get_columns_name_with_objects(_TABLE)
 _EMBED_MANY = {
@@ -60,6 +59,7 @@ def get_file_info_from_headers(headers):
 
 @api.route('/files', methods=['POST'])
 @decorators.login_required
+@decorators.streamed_payload
 def create_files(user):
     file_info = get_file_info_from_headers(dict(flask.request.headers))
     swift = dci_config.get_store('files')
@@ -100,6 +100,7 @@ def create_files(user):
 
     content = files.get_stream_or_content_from_request(flask.request)
     swift.upload(file_path, content)
+    files.verify_streamed_payload(lambda: swift.delete(file_path))
     s_file = swift.head(file_path)
 
     etag = utils.gen_etag()
@@ -151,7 +152,8 @@ def get_all_files(user, j_id=None):
     """
     args = schemas.args(flask.request.args.to_dict())
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _FILES_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _FILES_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     # If it's not an admin then restrict the view to the team's file
     if not user.is_super_admin():
@@ -160,11 +162,17 @@ def get_all_files(user, j_id=None):
         query.add_extra_condition(_TABLE.c.job_id == j_id)
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
+    if query.can_stream():
+        return v1_utils.stream_result(query, 'files', _TABLE.name,
+                                      args['embed'], _EMBED_MANY)
+
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
-    return json.jsonify({'files': rows, '_meta': {'count': nb_rows}})
+    return json.jsonify({'files': rows,
+                         '_meta': {'count': nb_rows,
+                                   'next': query.next_cursor(rows)}})
 
 
 @api.route('/files/<uuid:file_id>', methods=['GET'])
@@ -41,7 +41,6 @@ from dci.api.v1 import metas
 from dci import dci_config
 
 
-_FILES_FOLDER = dci_config.generate_conf()['FILES_UPLOAD_FOLDER']
 _TABLE = models.JOBS
 _VALID_EMBED = embeds.jobs()
 # associate column names with the corresponding SA Column object
@@ -303,7 +302,8 @@ def _validate_input(values, user):
 def _get_job(user, job_id, embed):
     # build the query thanks to the QueryBuilder class
     args = {'embed': embed}
-    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
@@ -311,8 +311,8 @@ def _get_job(user, job_id, embed):
     query.add_extra_condition(_TABLE.c.id == job_id)
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
     if len(rows) != 1:
@@ -424,7 +424,8 @@ def get_all_jobs(user, topic_id=None):
     args = schemas.args(flask.request.args.to_dict())
 
     # build the query thanks to the QueryBuilder class
-    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     # add extra conditions for filtering
 
@@ -439,12 +440,27 @@ def get_all_jobs(user, topic_id=None):
     # # Get only the non archived jobs
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
+    etag = query.get_etag(user.id)
+    response = v1_utils.not_modified(etag)
+    if response is not None:
+        return response
+
+    if query.can_stream():
+        return v1_utils.with_etag(
+            v1_utils.stream_result(query, 'jobs', _TABLE.name,
+                                   args['embed'], _EMBED_MANY),
+            etag)
+
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'jobs': rows, '_meta': {'count': nb_rows}})
+    return v1_utils.with_etag(
+        flask.jsonify({'jobs': rows,
+                       '_meta': {'count': nb_rows,
+                                 'next': query.next_cursor(rows)}}),
+        etag)
 
 
 @api.route('/jobs/<uuid:job_id>/components', methods=['GET'])
@@ -565,7 +581,8 @@ def get_all_results_from_jobs(user, j_id):
         raise auth.UNAUTHORIZED
 
     swift = dci_config.get_store('files')
-    job_files = json.loads(files.get_all_files(j_id).response[0])['files']
+    job_files = json.loads(
+        files.get_all_files(j_id).get_data(as_text=True))['files']
     r_files = [file for file in job_files
                if file['mime'] == 'application/junit']
 
@@ -82,7 +82,8 @@ def get_all_jobstates(user, j_id=None):
     """
     args = schemas.args(flask.request.args.to_dict())
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _JS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
 
@@ -91,12 +92,14 @@ def get_all_jobstates(user, j_id=None):
         query.add_extra_condition(_TABLE.c.job_id == j_id)
 
     # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'jobstates': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'jobstates': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 @api.route('/jobstates/<uuid:js_id>', methods=['GET'])
@@ -19,6 +19,7 @@ from sqlalchemy import sql
 
 from dci.api.v1 import api
 from dci import decorators
+from dci.common import monitoring
 from dci.db import models
 
 
@@ -79,3 +80,11 @@ def get_all_metrics(user):
 
     return flask.jsonify({'topics': data,
                           '_meta': {'count': len(topics)}})
+
+
+@api.route('/_metrics', methods=['GET'])
+@decorators.login_required
+@decorators.has_role(['SUPER_ADMIN'])
+def get_runtime_metrics(user):
+    return flask.Response(monitoring.generate_latest(), 200,
+                          content_type=monitoring.CONTENT_TYPE)
@@ -88,18 +88,21 @@ def update_permission(user, permission_id):
 @decorators.login_required
 def get_all_permissions(user):
     args = schemas.args(flask.request.args.to_dict())
-    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     query.add_extra_condition(
         _TABLE.c.state != 'archived'
     )
 
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'permissions': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'permissions': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 @api.route('/permissions/<uuid:permission_id>', methods=['GET'])
@@ -83,7 +83,8 @@ def get_all_remotecis(user, t_id=None):
     args = schemas.args(flask.request.args.to_dict())
 
     # build the query thanks to the QueryBuilder class
-    query = v1_utils.QueryBuilder(_TABLE, args, _R_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _R_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
@@ -94,10 +95,13 @@ def get_all_remotecis(user, t_id=None):
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'remotecis': rows, '_meta': {'count': len(rows)}})
+    return flask.jsonify({'remotecis': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 @api.route('/remotecis/<uuid:r_id>', methods=['GET'])
@@ -92,7 +92,8 @@ def update_role(user, role_id):
 @decorators.login_required
 def get_all_roles(user):
     args = schemas.args(flask.request.args.to_dict())
-    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
@@ -106,12 +107,14 @@ def get_all_roles(user):
     if user['role_id'] == auth.get_role_id('USER'):
         query.add_extra_condition(_TABLE.c.id == user['role_id'])
 
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'roles': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'roles': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 @api.route('/roles/<uuid:role_id>', methods=['GET'])
@@ -91,26 +91,36 @@ def get_topic_by_id(user, topic_id):
 def get_all_topics(user):
     args = schemas.args(flask.request.args.to_dict())
     # if the user is an admin then he can get all the topics
-    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if not user.is_super_admin() and not user.is_product_owner():
         if 'teams' in args['embed']:
             raise dci_exc.DCIException('embed=teams not authorized.',
                                        status_code=401)
-        query.add_extra_condition(_TABLE.c.id.in_(v1_utils.user_topic_ids(user)))  # noqa
+        query.add_extra_condition(_TABLE.c.id.in_(list(v1_utils.user_topic_ids(user))))  # noqa
 
     if user.is_product_owner():
         query.add_extra_condition(_TABLE.c.product_id == user.product_id)
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
+    etag = query.get_etag(user.id)
+    response = v1_utils.not_modified(etag)
+    if response is not None:
+        return response
+
     # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'topics': rows, '_meta': {'count': nb_rows}})
+    return v1_utils.with_etag(
+        flask.jsonify({'topics': rows,
+                       '_meta': {'count': nb_rows,
+                                 'next': query.next_cursor(rows)}}),
+        etag)
 
 
 @api.route('/topics/<uuid:topic_id>', methods=['PUT'])
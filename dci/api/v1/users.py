@@ -101,7 +101,8 @@ def create_users(user):
 @decorators.login_required
 def get_all_users(user, team_id=None):
     args = schemas.args(flask.request.args.to_dict())
-    query = v1_utils.QueryBuilder(_TABLE, args, _USERS_COLUMNS, ['password'])
+    query = v1_utils.QueryBuilder(_TABLE, args, _USERS_COLUMNS, ['password'],
+                                  embed_many=_EMBED_MANY)
 
     if not user.is_super_admin():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams))
@@ -112,12 +113,14 @@ def get_all_users(user, team_id=None):
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
     # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
     rows = query.execute(fetchall=True)
+    nb_rows = query.get_number_of_rows()
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
                                   _EMBED_MANY)
 
-    return flask.jsonify({'users': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'users': rows,
+                          '_meta': {'count': nb_rows,
+                                    'next': query.next_cursor(rows)}})
 
 
 def user_by_id(user, user_id):
@@ -167,6 +170,8 @@ def put_current_user(user):
     })
 
     flask.g.db_conn.execute(query)
+    if new_password:
+        flask.current_app.verified_passwords.clear()
     return flask.Response(None, 204, headers={'ETag': etag},
                           content_type='application/json')
 
@@ -207,6 +212,9 @@ def put_user(user, user_id):
     if not result.rowcount:
         raise dci_exc.DCIConflict('User', user_id)
 
+    if 'password' in values:
+        flask.current_app.verified_passwords.clear()
+
     return flask.Response(None, 204, headers={'ETag': values['etag']},
                           content_type='application/json')
 
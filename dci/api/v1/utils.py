@@ -14,15 +14,45 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import collections
+import datetime
 import flask
+import hashlib
+import itertools
+import json
+import re
+import six
 from sqlalchemy import sql, func
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import operators
+from sqlalchemy.sql import util as sql_util
+from sqlalchemy.sql import visitors
+from sqlalchemy import types
+import time
 import uuid
 
 from dci import auth
 from dci.common import exceptions as dci_exc
+from dci.common import instrumentation
 from dci.common import utils
 from dci.db import models
 from dci.db import embeds
+from dci.db import statements
+
+
+def _existence_query(table):
+    def build():
+        where_clause = table.c.id == sql.bindparam('id')
+
+        if 'state' in table.columns:
+            where_clause = sql.and_(table.c.state != 'archived',
+                                    where_clause)
+
+        return sql.select([table]).where(where_clause)
+
+    return statements.cached(('verify_existence_and_get', table), build)
 
 
 def verify_existence_and_get(id, table, get_id=False):
@@ -31,13 +61,8 @@ def verify_existence_and_get(id, table, get_id=False):
     exception.
     """
 
-    where_clause = table.c.id == id
-
-    if 'state' in table.columns:
-        where_clause = sql.and_(table.c.state != 'archived', where_clause)
-
-    query = sql.select([table]).where(where_clause)
-    result = flask.g.db_conn.execute(query).fetchone()
+    query = _existence_query(table)
+    result = flask.g.db_conn.execute(query, id=id).fetchone()
 
     if result is None:
         raise dci_exc.DCIException('Resource "%s" not found.' % id,
@@ -47,28 +72,78 @@ def verify_existence_and_get(id, table, get_id=False):
     return result
 
 
+def _all_topics_query():
+    return sql.select([models.TOPICS])
+
+
+def _product_topics_query(product_id_is_null):
+    if product_id_is_null:
+        where_clause = models.TOPICS.c.product_id == None  # noqa
+    else:
+        where_clause = models.TOPICS.c.product_id == sql.bindparam(
+            'product_id')
+    return sql.select([models.TOPICS]).where(where_clause)
+
+
+def _teams_topics_query():
+    team_ids = sql.cast(sql.bindparam('team_ids'),
+                        pg.ARRAY(pg.UUID()))
+    where_clause = sql.and_(
+        models.TOPICS.c.state == 'active',
+        models.TEAMS.c.state == 'active',
+        models.JOINS_TOPICS_TEAMS.c.team_id == func.any(team_ids)
+    )
+    return (sql.select([models.JOINS_TOPICS_TEAMS.c.topic_id])
+            .select_from(models.JOINS_TOPICS_TEAMS
+                         .join(models.TOPICS).join(models.TEAMS))
+            .where(where_clause))
+
+
+TOPIC_IDS_TABLES = ('topics', 'topics_teams', 'teams')
+
+
 def user_topic_ids(user):
-    """Retrieve the list of topics IDs a user has access to."""
+    """Retrieve the set of topics IDs a user has access to.
+
+    The set is computed once per request and kept in the topic ids cache
+    of the application, which is cleared when topics, teams or their
+    membership are written to.
+    """
+
+    if user.is_super_admin():
+        key = 'all'
+    elif user.is_product_owner() or user.is_feeder():
+        key = 'product:%s' % user.product_id
+    else:
+        key = 'teams:%s' % ','.join(sorted(str(team) for team in user.teams))
+
+    topic_ids = getattr(flask.g, 'topic_ids', None)
+    if topic_ids is None:
+        topic_ids = flask.g.topic_ids = {}
+    if key not in topic_ids:
+        topic_ids[key] = flask.current_app.topic_ids_cache.get_or_load(
+            key, lambda: _user_topic_ids(user))
+    return topic_ids[key]
+
 
+def _user_topic_ids(user):
     if user.is_super_admin():
-        query = sql.select([models.TOPICS])
+        query = statements.cached('all_topics', _all_topics_query)
+        params = {}
     elif user.is_product_owner() or user.is_feeder():
-        query = sql.select([models.TOPICS]).where(
-            models.TOPICS.c.product_id == user.product_id
-        )
+        product_id_is_null = user.product_id is None
+        query = statements.cached(
+            ('product_topics', product_id_is_null),
+            lambda: _product_topics_query(product_id_is_null))
+        params = {}
+        if not product_id_is_null:
+            params['product_id'] = user.product_id
     else:
-        where_clause = sql.and_(
-            models.TOPICS.c.state == 'active',
-            models.TEAMS.c.state == 'active',
-            models.JOINS_TOPICS_TEAMS.c.team_id.in_(user.teams)
-        )
-        query = (sql.select([models.JOINS_TOPICS_TEAMS.c.topic_id])
-                 .select_from(models.JOINS_TOPICS_TEAMS
-                              .join(models.TOPICS).join(models.TEAMS))
-                 .where(where_clause))
+        query = statements.cached('teams_topics', _teams_topics_query)
+        params = {'team_ids': [str(team) for team in user.teams]}
 
-    rows = flask.g.db_conn.execute(query).fetchall()
-    return [str(row[0]) for row in rows]
+    rows = flask.g.db_conn.execute(query, **params).fetchall()
+    return frozenset(str(row[0]) for row in rows)
 
 
 def verify_team_in_topic(user, topic_id):
@@ -130,14 +205,105 @@ def add_sort_to_query(query, sort_list):
     return query
 
 
+# the where arguments are "<key><operator><value>", the operators are :
+# (equal, "a|b" for one of the values, "a*" for the values starting with
+# a, "null"), !: (not), >, >=, < and <=. With : and !:, a backslash makes
+# the next character literal: "a\|b", "a\*" and "\null".
+_WHERE_RE = re.compile(
+    r'^(?P<name>[\w.]+)(?P<op>!:|:|>=|<=|>|<)(?P<value>.*)$')
+_RANGE_OPERATORS = {
+    '>': operators.gt,
+    '>=': operators.ge,
+    '<': operators.lt,
+    '<=': operators.le,
+}
+_DATETIME_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                     '%Y-%m-%dT%H:%M', '%Y-%m-%d')
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def _parse_datetime(value):
+    for date_format in _DATETIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.replace(' ', 'T'),
+                                              date_format)
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _where_value(column, value):
+    """Return value converted to the type of column, raise ValueError
+    when it is not one."""
+
+    if str(column.type) == 'UUID':
+        uuid.UUID(value)
+        return value
+    if isinstance(column.type, types.Enum):
+        if value not in column.type.enums:
+            raise ValueError(value)
+        return value
+    python_type = _python_type(column)
+    if python_type == int:
+        return int(value)
+    if python_type == bool:
+        return _BOOLEANS[value.lower()]
+    if python_type == datetime.datetime:
+        return _parse_datetime(value)
+    return value
+
+
+def _is_text(column):
+    python_type = _python_type(column)
+    return (python_type is not None and
+            issubclass(python_type, six.string_types) and
+            not isinstance(column.type, types.Enum))
+
+
+def _like_prefix(value):
+    """LIKE pattern of the values starting with value."""
+
+    for char in ('\\', '%', '_'):
+        value = value.replace(char, '\\' + char)
+    return value + '%'
+
+
+def _split_where_value(value):
+    """Return the values of value separated by the | which are not
+    escaped, as (value, prefix) pairs, prefix telling whether the value
+    ends with a * which is not escaped."""
+
+    values = []
+    text, prefix = '', False
+    chars = iter(value)
+    for char in chars:
+        if char == '|':
+            values.append((text, prefix))
+            text, prefix = '', False
+            continue
+        if prefix:
+            text += '*'
+        prefix = char == '*'
+        if char == '\\':
+            text += next(chars, '\\')
+        elif not prefix:
+            text += char
+    values.append((text, prefix))
+    return values
+
+
 def where_query(where, table, columns):
     where_conds = []
     err_msg = 'Invalid where key: "%s"'
 
     def _get_column(table, columns, name):
-        payload = {'error': 'where key must have the following form '
-                   '"key:value"'}
-
         if '.' in name:
             subtable_name, name = name.split('.')
             table_obj = embeds.EMBED_STRING_TO_OBJECT[table.name]
@@ -154,26 +320,46 @@ def where_query(where, table, columns):
         return getattr(table.c, name)
 
     for where_elem in where:
-        try:
-            name, value = where_elem.split(':', 1)
-        except ValueError:
+        match = _WHERE_RE.match(where_elem)
+        if match is None:
             payload = {'error': 'where key must have the following form '
                                 '"key:value"'}
             raise dci_exc.DCIException(err_msg % where_elem, payload=payload)
+        name, op, value = match.group('name', 'op', 'value')
 
         m_column = _get_column(table, columns, name)
-        # TODO(yassine): do the same for columns type different from string
-        # if it's an Integer column, then try to cast the value
+        negated = op == '!:'
+        # the column is never wrapped in a function so that its indexes
+        # can be used
         try:
-            if str(m_column.type) == "UUID" and uuid.UUID(value):
-                pass
-            elif m_column.type.python_type == int:
-                value = int(value)
-        except ValueError:
-            payload = {name: '%s is not a %s' % (name, m_column.type)}
+            if op in _RANGE_OPERATORS:
+                condition = _RANGE_OPERATORS[op](
+                    m_column, _where_value(m_column, value))
+            elif value == 'null':
+                condition = m_column.is_(None)
+            else:
+                values = _split_where_value(value)
+                text, prefix = values[0]
+                if len(values) > 1:
+                    # the * ending the values of a list are literal
+                    condition = m_column.in_([
+                        _where_value(m_column, text + '*' * prefix)
+                        for text, prefix in values])
+                elif prefix and _is_text(m_column):
+                    condition = m_column.like(_like_prefix(text),
+                                              escape='\\')
+                else:
+                    condition = m_column == _where_value(
+                        m_column, text + '*' * prefix)
+        except (ValueError, KeyError):
+            if isinstance(m_column.type, types.Enum):
+                payload = {name: '%s is not one of %s' % (
+                    name, ', '.join(m_column.type.enums))}
+            else:
+                payload = {name: '%s is not a %s' % (name, m_column.type)}
             raise dci_exc.DCIException(err_msg % name, payload=payload)
 
-        where_conds.append(m_column == value)
+        where_conds.append(sql.not_(condition) if negated else condition)
     return where_conds
 
 
@@ -190,6 +376,138 @@ def get_number_of_rows(root_table, where=None):
     return flask.g.db_conn.execute(query).scalar()
 
 
+class _Explain(sql.expression.Executable, sql.expression.ClauseElement):
+
+    # routed to the replicas like the query it explains
+    is_readonly = True
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(_Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) %s' % compiler.process(element.query, **kw)
+
+
+def estimate_number_of_rows(query):
+    """Return the number of rows of query estimated by the planner from
+    the table statistics, without running it."""
+
+    plan = flask.g.db_conn.execute(_Explain(query)).scalar()
+    if not isinstance(plan, list):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def encode_cursor(values):
+    """Return the opaque cursor of a row from the values of its sort
+    keys."""
+
+    data = json.dumps(values, cls=utils.JSONEncoder).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """Return the values of the sort keys encoded in cursor."""
+
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (TypeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise dci_exc.DCIException('Invalid cursor: "%s"' % cursor)
+    return values
+
+
+def _cursor_value(column, value):
+    """Return a value of a cursor converted to the type of column, raise
+    ValueError when it is not one."""
+
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        raise ValueError(value)
+    return _where_value(column, six.text_type(value))
+
+
+def _after(column, descending, value):
+    """Condition on column for the rows sorted after value, NULL values
+    come last in ascending order and first in descending order."""
+
+    if descending:
+        if value is None:
+            return column.isnot(None)
+        return column < value
+    if value is None:
+        return sql.false()
+    if column.nullable:
+        return sql.or_(column > value, column.is_(None))
+    return column > value
+
+
+def fetch_batches(query, size, params=None):
+    """Return an iterator over the rows of query in lists of size rows
+    read from a server-side cursor, instead of loading all of them at
+    once.
+
+    The query is executed and its first rows are read right away, so that
+    its errors are raised before a response starts being written. The
+    reads are recorded in the db timings, the Server-Timing header of the
+    response only counts the ones made before it is sent.
+    """
+
+    connection = flask.g.db_conn.execution_options(stream_results=True)
+    batches = _fetch_batches(connection.execute(query, params or {}), size)
+    first = next(batches, None)
+    if first is None:
+        return iter([])
+    return itertools.chain([first], batches)
+
+
+def _fetch_batches(result, size):
+    try:
+        while True:
+            start = time.time()
+            rows = result.fetchmany(size)
+            instrumentation.record('db', time.time() - start)
+            if not rows:
+                break
+            yield rows
+    finally:
+        result.close()
+
+
+def _count_resources(rows, root_id):
+    """Count the resources of rows whose rows follow each other."""
+
+    count = 0
+    previous = None
+    for row in rows:
+        if count == 0 or row[root_id] != previous:
+            count += 1
+            previous = row[root_id]
+    return count
+
+
+def not_modified(etag):
+    """Return a 304 response when the If-None-Match header of the request
+    matches etag, None otherwise."""
+
+    if etag is None or not flask.request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(flask.Response(None, 304), etag)
+
+
+def with_etag(response, etag):
+    """Add the weak validator etag to response, when there is one."""
+
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 def request_wants_html():
     best = (flask.request.accept_mimetypes
             .best_match(['text/html', 'application/json']))
@@ -199,13 +517,121 @@ def request_wants_html():
             flask.request.accept_mimetypes['application/json'])
 
 
+_EMBEDS_COLUMNS = {}
+
+
+def _embeds_columns(root_table_name):
+    """Return the columns of the embeds of root_table_name usable to sort
+    the resources, by their prefixed names."""
+
+    columns = _EMBEDS_COLUMNS.get(root_table_name)
+    if columns is not None:
+        return columns
+    # add embeds field for the sorting
+    columns = {}
+    if root_table_name in embeds.EMBED_STRING_TO_OBJECT:
+        for embed_elem in embeds.EMBED_STRING_TO_OBJECT[root_table_name].values():  # noqa
+            if isinstance(embed_elem, list):
+                embed_str_to_objects = {'%s_%s' % (c.table.name, c.name): c for c in embed_elem}  # noqa
+                columns.update(embed_str_to_objects)
+            else:
+                columns.update(
+                    get_columns_name_with_objects(embed_elem, table_prefix=True))  # noqa
+    _EMBEDS_COLUMNS[root_table_name] = columns
+    return columns
+
+
+def _clause_shape(clause, bound):
+    """Return the structural key of clause, appending its values to bound,
+    or None when it is not made of the columns, values and operators the
+    list queries are built from.
+
+    Two clauses with the same key only differ by their values, the list
+    of values of IN being a single one whatever its length.
+    """
+
+    if isinstance(clause, sql.expression.BindParameter):
+        bound.append((clause, clause.effective_value))
+        return 'value', clause.type._type_affinity
+    if isinstance(clause, sql.expression.ColumnClause):
+        return 'column', getattr(clause.table, 'name', None), clause.key
+    if isinstance(clause, (sql.expression.Null, sql.expression.True_,
+                           sql.expression.False_)):
+        return type(clause)
+    if isinstance(clause, sql.expression.Grouping):
+        return _clause_shape(clause.element, bound)
+    if isinstance(clause, sql.expression.BinaryExpression):
+        right = clause.right
+        if (clause.operator in (operators.in_op, operators.notin_op) and
+                isinstance(right, sql.expression.Grouping) and all(
+                    isinstance(value, sql.expression.BindParameter)
+                    for value in right.element.clauses)):
+            bound.append((right, [value.effective_value
+                                  for value in right.element.clauses]))
+            right_shape = 'values'
+        else:
+            right_shape = _clause_shape(right, bound)
+        left_shape = _clause_shape(clause.left, bound)
+        if left_shape is None or right_shape is None:
+            return None
+        return (left_shape, clause.operator, right_shape,
+                tuple(sorted(clause.modifiers.items())))
+    if isinstance(clause, sql.expression.ClauseList):
+        shapes = tuple(_clause_shape(element, bound)
+                       for element in clause.clauses)
+        if None in shapes:
+            return None
+        return type(clause), clause.operator, shapes
+    return None
+
+
+def _parametrize(clauses, bound):
+    """Return copies of clauses whose values found by _clause_shape() are
+    bind parameters named after their position in bound.
+
+    A list of values of IN becomes an expanding bind parameter.
+    """
+
+    replacements = {}
+    for position, (element, _) in enumerate(bound):
+        name = '_p%d' % position
+        if isinstance(element, sql.expression.Grouping):
+            replacements[id(element)] = sql.bindparam(
+                name, expanding=True,
+                type_=element.element.clauses[0].type)
+        else:
+            replacements[id(element)] = sql.bindparam(
+                name, type_=element.type)
+
+    def replace(element):
+        return replacements.get(id(element))
+
+    return [visitors.replacement_traverse(clause, {}, replace)
+            for clause in clauses]
+
+
+# bind parameters of the limit and offset of the queries
+_LIMIT = sql.bindparam('_limit', type_=types.Integer)
+_OFFSET = sql.bindparam('_offset', type_=types.Integer)
+
+# label of the COUNT(*) OVER() column, the columns without a table prefix
+# are left out of the formatted resources
+_COUNT_LABEL = '_count'
+
+
 class QueryBuilder(object):
 
-    def __init__(self, root_table, args={}, strings_to_columns={}, ignore_columns=None):  # noqa
+    def __init__(self, root_table, args={}, strings_to_columns={}, ignore_columns=None, embed_many=None):  # noqa
         self._root_table = root_table
         self._embeds = args.get('embed', [])
         self._limit = args.get('limit', None)
         self._offset = args.get('offset', None)
+        self._cursor = args.get('cursor', None)
+        self._count = args.get('count', None)
+        self._number_of_rows = None
+        self._streamed = False
+        self._params = {}
+        self._sort_args = tuple(args.get('sort', []))
         self._sort = self._get_sort_query_with_embeds(args.get('sort', []),
                                                       root_table.name,
                                                       strings_to_columns)
@@ -214,40 +640,170 @@ class QueryBuilder(object):
         self._strings_to_columns = strings_to_columns
         self._extras_conditions = []
         self._ignored_columns = ignore_columns or []
+        self._embed_many = embed_many or {}
+        self._fields = self._get_fields(args.get('fields', []))
 
     def _get_sort_query_with_embeds(self, args_sort, root_table_name, strings_to_columns):  # noqa
-        # add embeds field for the sorting
-        strings_to_columns_with_embeds = {}
-        if root_table_name in embeds.EMBED_STRING_TO_OBJECT:
-            for embed_elem in embeds.EMBED_STRING_TO_OBJECT[root_table_name].values():  # noqa
-                if isinstance(embed_elem, list):
-                    embed_str_to_objects = {'%s_%s' % (c.table.name, c.name): c for c in embed_elem}  # noqa
-                    strings_to_columns_with_embeds.update(embed_str_to_objects)
-                else:
-                    strings_to_columns_with_embeds.update(
-                        get_columns_name_with_objects(embed_elem, table_prefix=True))  # noqa
+        strings_to_columns_with_embeds = _embeds_columns(root_table_name)
         return sort_query(args_sort, strings_to_columns, strings_to_columns_with_embeds)  # noqa
 
     def add_extra_condition(self, condition):
         self._extras_conditions.append(condition)
 
-    def _filtered_root_columns(self):
+    def _root_columns(self):
         # remove ignored columns
         columns_from_root_table = dict(self._strings_to_columns)
         for column_to_ignore in self._ignored_columns:
             columns_from_root_table.pop(column_to_ignore, None)
-        return list(columns_from_root_table.values())
+        return columns_from_root_table
+
+    def _filtered_root_columns(self):
+        columns = self._root_columns()
+        fields = self._fields.get('')
+        if fields is None:
+            return list(columns.values())
+        # the id and the sort keys are needed to format the resources and
+        # to compute the next cursor
+        fields = fields | set(['id'])
+        fields.update(sort.element.name for sort in self._sort
+                      if getattr(sort.element, 'table', None)
+                      is self._root_table)
+        return [column for name, column in columns.items()
+                if name in fields]
+
+    def _embed_columns(self, embed_elem, fields=None):
+        select_elem = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name][embed_elem]  # noqa
+        if isinstance(select_elem, list):
+            columns = select_elem
+        else:
+            columns = list(select_elem.c)
+        if fields is None:
+            return columns
+        return [column for column in columns
+                if column.name in fields or column.name == 'id']
+
+    def _get_fields(self, args_fields):
+        """Group the fields argument by embed, the fields of the root
+        resource being under ''.
+
+        The resources of an embed without fields keep all their fields.
+        """
+
+        embed_objects = embeds.EMBED_STRING_TO_OBJECT.get(
+            self._root_table.name, {})
+        embed_list = set()
+        for embed_elem in self._embeds:
+            embed_list.update([embed_elem.split('.')[0], embed_elem])
+
+        fields = {}
+        for field in args_fields:
+            embed_elem, _, name = field.rpartition('.')
+            if not embed_elem:
+                valid = self._root_columns().keys()
+            elif embed_elem in embed_list and embed_elem in embed_objects:
+                valid = [c.name for c in self._embed_columns(embed_elem)]
+            else:
+                valid = ['%s.%s' % (e, c.name) for e in sorted(embed_list)
+                         if e in embed_objects
+                         for c in self._embed_columns(e)]
+            if name not in valid:
+                raise dci_exc.DCIException(
+                    'Invalid field %s' % field,
+                    payload={'Valid fields': sorted(valid)}
+                )
+            fields.setdefault(embed_elem, set()).add(name)
+        return fields
+
+    def _sort_keys(self):
+        """Return the (column, descending) pairs the resources are
+        sorted by, ending with their id, or None when they are sorted by
+        the fields of an embed."""
+
+        keys = []
+        for sort in self._sort:
+            column = sort.element
+            if getattr(column, 'table', None) is not self._root_table:
+                return None
+            keys.append((column, sort.modifier is operators.desc_op))
+        if not any(column.name == 'id' for column, _ in keys):
+            descending = keys[-1][1] if keys else False
+            keys.append((self._root_table.c.id, descending))
+        return keys
+
+    def _paginated(self):
+        return bool(self._limit or self._cursor)
 
     def _add_sort_to_query(self, query):
         for sort in self._sort:
             query = query.order_by(sort)
+        # the id makes the order of the pages stable, and keeps the rows
+        # of a streamed resource together
+        keys = None
+        if self._paginated() or self._streamed:
+            keys = self._sort_keys()
+        if keys and len(keys) > len(self._sort):
+            column, descending = keys[-1]
+            query = query.order_by(sql.desc(column) if descending
+                                   else sql.asc(column))
+        elif keys is None and self._streamed:
+            query = query.order_by(self._root_table.c.id)
         return query
 
-    def _add_where_to_query(self, query):
-        for where in self._where:
-            query = query.where(where)
-        for e_c in self._extras_conditions:
-            query = query.where(e_c)
+    def _cursor_conditions(self):
+        """Return the condition selecting the resources sorted after the
+        cursor, in a list which is empty without cursor."""
+
+        if not self._cursor:
+            return []
+
+        keys = self._sort_keys()
+        if keys is None:
+            raise dci_exc.DCIException(
+                'The cursor can not be used when sorting on embeds')
+        try:
+            values = [_cursor_value(column, value) for (column, _), value
+                      in zip(keys, decode_cursor(self._cursor, len(keys)))]
+        except (ValueError, KeyError):
+            raise dci_exc.DCIException('Invalid cursor: "%s"' % self._cursor)
+
+        directions = set(descending for _, descending in keys)
+        if (len(directions) == 1 and
+                not any(column.nullable for column, _ in keys) and
+                None not in values):
+            # a row comparison can be answered from a single index scan
+            columns = sql.tuple_(*[column for column, _ in keys])
+            bounds = sql.tuple_(*[sql.literal(value, type_=column.type)
+                                  for (column, _), value in zip(keys,
+                                                                values)])
+            if directions.pop():
+                return [columns < bounds]
+            return [columns > bounds]
+
+        conditions = []
+        equals = []
+        for (column, descending), value in zip(keys, values):
+            conditions.append(
+                sql.and_(*(equals + [_after(column, descending, value)])))
+            equals.append(column.is_(None) if value is None
+                          else column == value)
+        return [sql.or_(*conditions)]
+
+    def next_cursor(self, rows):
+        """Return the cursor of the page following the formatted rows,
+        or None when it is the last page."""
+
+        if not self._limit or len(rows) < self._limit:
+            return None
+        keys = self._sort_keys()
+        if keys is None:
+            return None
+        return encode_cursor([rows[-1][column.name] for column, _ in keys])
+
+    def _add_where_to_query(self, query, conditions=None):
+        if conditions is None:
+            conditions = self._where + self._extras_conditions
+        for condition in conditions:
+            query = query.where(condition)
         return query
 
     def _do_subquery(self):
@@ -255,6 +811,33 @@ class QueryBuilder(object):
         # for the root table
         return self._embeds and (self._limit or self._offset)
 
+    def _count_in_query(self):
+        """Whether the page query also returns the exact number of
+        resources, in a COUNT(*) OVER() column computed before the
+        limit.
+
+        Without limit nor offset all the resources are returned, they
+        are counted from the rows instead.
+        """
+
+        return (self._count == 'exact' and not self._cursor and
+                self._number_of_rows is None and
+                bool(self._limit or self._offset))
+
+    def _count_from_rows(self, rows):
+        """Return the exact number of resources read from the page
+        rows, or None when it needs a COUNT statement."""
+
+        if self._count != 'exact' or self._cursor:
+            return None
+        if not rows:
+            # an empty page past the last resource says nothing
+            return None if self._offset else 0
+        if self._count_in_query():
+            return rows[0][_COUNT_LABEL]
+        root_id = '%s_id' % self._root_table.name
+        return len(set(row[root_id] for row in rows))
+
     def _get_embed_list(self, embed_joins):
         valid_embed = embed_joins.keys()
         embed_list = []
@@ -270,71 +853,315 @@ class QueryBuilder(object):
             embed_list.append(embed_elem)
         return sorted(set(embed_list))
 
+    def _aggregated_embeds(self, embed_list, embed_joins):
+        """Return the one-to-many embeds which can be fetched with a
+        json_agg() subquery instead of a join.
+
+        An embed is joined when it has embeds of its own, when it is
+        below another one-to-many embed or when its tables are used to
+        sort or filter the query.
+        """
+
+        if not flask.current_app.config.get('EMBED_JSON_AGGREGATION'):
+            return set()
+
+        referenced = set()
+        for clause in self._sort + self._where + self._extras_conditions:
+            referenced.update(sql_util.find_tables(
+                clause, check_columns=True, include_aliases=True))
+
+        embed_objects = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name]
+        aggregated = set()
+        for embed_elem in embed_list:
+            parent = embed_elem.rpartition('.')[0]
+            if (not self._embed_many.get(embed_elem) or
+                    self._embed_many.get(parent) or
+                    isinstance(embed_objects[embed_elem], list)):
+                continue
+            if any(e.startswith(embed_elem + '.') for e in embed_list):
+                continue
+            if any(param['right'] in referenced
+                   for param in embed_joins[embed_elem]):
+                continue
+            aggregated.add(embed_elem)
+        return aggregated
+
+    def _embed_aggregate(self, embed_elem, params):
+        """Correlated subquery returning the rows of a one-to-many embed
+        as a JSON array.
+
+        It is labelled after its parent, format_result() then puts the
+        array where the embed goes, e.g. jobs_files becomes files and
+        topic_tests becomes the tests of the topic.
+        """
+
+        embed_objects = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name]
+        parent, _, name = embed_elem.rpartition('.')
+        if parent:
+            prefix = embed_objects[parent].name
+        else:
+            prefix = self._root_table.name
+
+        from_clause = params[0]['right']
+        for param in params[1:]:
+            from_clause = from_clause.join(param['right'], param['onclause'])
+        if embed_elem in self._fields:
+            row = func.json_build_object(*[
+                arg for column in self._embed_columns(
+                    embed_elem, self._fields[embed_elem])
+                for arg in (sql.literal(column.name), column)])
+        else:
+            # the alias of the embed is a reference to its whole row
+            row = sql.column(embed_objects[embed_elem].name)
+        aggregate = func.coalesce(func.json_agg(row),
+                                  sql.literal_column("'[]'::json"))
+        return (sql.select([aggregate])
+                .select_from(from_clause)
+                .where(params[0]['onclause'])
+                .as_scalar()
+                .label('%s_%s' % (prefix, name)))
+
+    def _shape(self, condition_shapes):
+        """Return the key of the query built from the arguments and the
+        shapes of its conditions."""
+
+        return (self._root_table.name,
+                tuple(self._embeds),
+                self._sort_args,
+                tuple(sorted((embed_elem, tuple(sorted(names)))
+                             for embed_elem, names in self._fields.items())),
+                tuple(sorted(self._root_columns())),
+                tuple(sorted(embed_elem for embed_elem, many
+                             in self._embed_many.items() if many)),
+                bool(self._limit), bool(self._offset), bool(self._cursor),
+                self._count_in_query(), self._streamed,
+                bool(flask.current_app.config.get('EMBED_JSON_AGGREGATION')),
+                condition_shapes)
+
     def get_query(self):
-        select_clause = [self._root_table]
-        if self._ignored_columns:
-            select_clause = self._filtered_root_columns()
+        """Return the statement of the query, the values of its bind
+        parameters being in self._params.
+
+        The statements are built once per shape of query and kept in a
+        cache of the QUERY_SHAPES_CACHE_SIZE last used ones, 0 disables
+        it. The shape is computed from the structure of the conditions,
+        they are neither compiled nor copied when it is found.
+        """
+
+        self._params = {}
+        if self._limit:
+            self._params[_LIMIT.key] = self._limit
+        if self._offset:
+            self._params[_OFFSET.key] = self._offset
+        conditions = (self._where + self._extras_conditions +
+                      self._cursor_conditions())
+
+        size = flask.current_app.config.get('QUERY_SHAPES_CACHE_SIZE')
+        bound = []
+        condition_shapes = tuple(_clause_shape(condition, bound)
+                                 for condition in conditions)
+        if not size or None in condition_shapes:
+            return self._build_query(conditions)
+
+        for position, (_, value) in enumerate(bound):
+            self._params['_p%d' % position] = value
+        return statements.cached_shape(
+            ('query_shape',) + self._shape(condition_shapes),
+            lambda: self._build_query(
+                _parametrize(conditions, bound)), size)
+
+    def _build_query(self, conditions):
+        root_columns = None
+        if self._ignored_columns or '' in self._fields:
+            root_columns = self._filtered_root_columns()
+        select_clause = root_columns or [self._root_table]
+        count = None
+        if self._count_in_query():
+            count = func.count().over().label(_COUNT_LABEL)
         root_select = self._root_table
         if self._do_subquery():
-            root_subquery = sql.select(select_clause)
-            root_subquery = self._add_where_to_query(root_subquery)
+            # the embeds are joined on the columns of the subquery, the
+            # fields are only picked from it
+            subquery_clause = [self._root_table]
+            if self._ignored_columns:
+                subquery_clause = list(self._root_columns().values())
+            if count is not None:
+                subquery_clause.append(count)
+            root_subquery = sql.select(subquery_clause)
+            root_subquery = self._add_where_to_query(root_subquery,
+                                                     conditions)
             root_subquery = self._add_sort_to_query(root_subquery)
             if self._limit:
-                root_subquery = root_subquery.limit(self._limit)
+                root_subquery = root_subquery.limit(_LIMIT)
             if self._offset:
-                root_subquery = root_subquery.offset(self._offset)
+                root_subquery = root_subquery.offset(_OFFSET)
             root_subquery = root_subquery.alias(self._root_table.name)
             select_clause = [root_subquery]
+            if root_columns is not None or count is not None:
+                select_clause = [root_subquery.c[column.name] for column
+                                 in root_columns or self._root_table.c]
+            if count is not None:
+                select_clause.append(
+                    root_subquery.c[_COUNT_LABEL].label(_COUNT_LABEL))
             root_select = root_subquery
+        elif count is not None:
+            select_clause = select_clause + [count]
 
         query = sql.select(select_clause, use_labels=True)
         if self._embeds:
             embed_joins = embeds.EMBED_JOINS.get(self._root_table.name)(root_select)  # noqa
             embed_list = self._get_embed_list(embed_joins)
+            aggregated = self._aggregated_embeds(embed_list, embed_joins)
             children = root_select
             # embed sort for embeds such like lastjob
             embed_sorts = []
             for embed_elem in embed_list:
+                if embed_elem in aggregated:
+                    select_clause.append(self._embed_aggregate(
+                        embed_elem, embed_joins[embed_elem]))
+                    continue
                 for param in embed_joins[embed_elem]:
                     children = children.join(param['right'], param['onclause'],
                                              param.get('isouter', False))
                     if param.get('sort', None) is not None:
                         embed_sorts.append(param.get('sort'))
                 select_elem = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name][embed_elem]  # noqa
-                if isinstance(select_elem, list):
-                    select_clause.extend(select_elem)
+                if (isinstance(select_elem, list) or
+                        embed_elem in self._fields):
+                    select_clause.extend(self._embed_columns(
+                        embed_elem, self._fields.get(embed_elem)))
                 else:
                     select_clause.append(select_elem)
             query = sql.select(select_clause, use_labels=True, from_obj=children)  # noqa
 
+        if self._do_subquery() or self._streamed:
+            # sort the resources before their embeds
+            query = self._add_sort_to_query(query)
+
         if self._embeds:
             for embed_sort in embed_sorts:
                 query = query.order_by(embed_sort)
 
         if not self._do_subquery():
-            query = self._add_where_to_query(query)
+            query = self._add_where_to_query(query, conditions)
 
             if self._limit:
-                query = query.limit(self._limit)
+                query = query.limit(_LIMIT)
             if self._offset:
-                query = query.offset(self._offset)
-        query = self._add_sort_to_query(query)
+                query = query.offset(_OFFSET)
+            if not self._streamed:
+                query = self._add_sort_to_query(query)
         return query
 
-    def get_number_of_rows(self, root_table=None, where=None):
-        if root_table is not None:
-            query = sql.select([func.count(root_table.c.id)])
-            query = query.where(where)
-        else:
-            query = sql.select([func.count(self._root_table.c.id)])
-            query = self._add_where_to_query(query)
+    def get_number_of_rows(self):
+        """Return the number of resources matching the conditions as
+        requested by the count argument: exact, estimate or none.
+
+        An exact count is read from the rows of the last execute() when
+        possible.
+        """
+
+        if self._count == 'none':
+            return None
+        if self._count == 'estimate':
+            query = sql.select([self._root_table.c.id])
+            return estimate_number_of_rows(self._add_where_to_query(query))
+        if self._number_of_rows is not None:
+            return self._number_of_rows
+        query = sql.select([func.count(self._root_table.c.id)])
+        query = self._add_where_to_query(query)
         return flask.g.db_conn.execute(query).scalar()
 
+    def get_etag(self, *keys):
+        """Return a weak validator of the resources matching the
+        conditions, computed from their number and last update instead of
+        their rows, or None with embeds since their updates would be
+        missed.
+
+        keys are the other values the response depends on. The number of
+        resources is reused as the exact count of _meta.
+
+        The aggregate reads all the matching resources, like the exact
+        count does. Without an exact count it is only run to answer an
+        If-None-Match header, the responses to the other requests have no
+        validator.
+        """
+
+        table = self._root_table
+        if self._embeds or 'updated_at' not in table.c:
+            return None
+        if self._count != 'exact' and not flask.request.if_none_match:
+            return None
+        query = sql.select([func.count(table.c.id),
+                            func.max(table.c.updated_at)])
+        count, updated_at = flask.g.db_conn.execute(
+            self._add_where_to_query(query)).fetchone()
+        if self._count == 'exact':
+            self._number_of_rows = count
+        data = json.dumps([flask.request.full_path, count, updated_at] +
+                          list(keys), cls=utils.JSONEncoder)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _sorted_by_embed_many(self):
+        """Whether the resources are sorted by the fields of an embed of
+        several elements, the rows of a resource are then not sorted
+        next to each other."""
+
+        embed_objects = embeds.EMBED_STRING_TO_OBJECT.get(
+            self._root_table.name, {})
+        sort_tables = set(getattr(sort.element, 'table', self._root_table)
+                          for sort in self._sort)
+        return any(embed_objects.get(embed_elem) in sort_tables
+                   for embed_elem, many in self._embed_many.items()
+                   if many)
+
+    def can_stream(self):
+        """Whether the resources can be streamed with stream_result(),
+        the listings without limit may not fit in memory."""
+
+        return (not self._limit and
+                bool(flask.current_app.config.get('STREAM_BATCH_SIZE')) and
+                not self._sorted_by_embed_many())
+
+    def stream(self, size):
+        """Return an iterator over the rows of the query in lists of about
+        size rows read from a server-side cursor, the rows of a resource
+        are never split between two lists."""
+
+        self._streamed = True
+        query = self.get_query()
+        return self._stream(fetch_batches(query, size, self._params))
+
+    def _stream(self, batches):
+        root_id = '%s_id' % self._root_table.name
+        count = 0
+        pending = []
+        for rows in batches:
+            rows = pending + rows
+            # the last resource may go on in the next rows
+            end = len(rows)
+            while end > 0 and rows[end - 1][root_id] == rows[-1][root_id]:
+                end -= 1
+            pending = rows[end:]
+            if end:
+                count += _count_resources(rows[:end], root_id)
+                yield rows[:end]
+        if pending:
+            count += 1
+            yield pending
+        if self._count == 'exact' and not self._cursor and not self._offset:
+            self._number_of_rows = count
+
     def execute(self, fetchall=False, fetchone=False):
         if fetchall:
-            return flask.g.db_conn.execute(self.get_query()).fetchall()
+            query = self.get_query()
+            rows = flask.g.db_conn.execute(query, self._params).fetchall()
+            if self._number_of_rows is None:
+                self._number_of_rows = self._count_from_rows(rows)
+            return rows
         elif fetchone:
-            return flask.g.db_conn.execute(self.get_query()).fetchone()
+            query = self.get_query()
+            return flask.g.db_conn.execute(query, self._params).fetchone()
 
     def _get_pg_query(self):
         from sqlalchemy.dialects import postgresql
@@ -362,28 +1189,61 @@ def _format_level_1(rows, root_table_name):
       'b' : {'id': 'id4', 'name': 'name4'}
     ]
     """
+    if not rows:
+        return []
+
+    layout = _row_layout(tuple(rows[0].keys()))
     result_rows = []
     for row in rows:
-        row = dict(row)
+        values = tuple(row)
         result_row = {}
-        prefixes_to_remove = []
-        for field in row:
-            prefix, suffix = field.split('_', 1)
-            if suffix == 'id' and row[field] is None:
-                prefixes_to_remove.append(prefix)
-            if prefix not in result_row:
-                result_row[prefix] = {suffix: row[field]}
-            else:
-                result_row[prefix].update({suffix: row[field]})
-        # remove field with id == null
-        for prefix_to_remove in prefixes_to_remove:
-            result_row.pop(prefix_to_remove)
+        for prefix, id_index, fields in layout:
+            # remove field with id == null
+            if id_index is not None and values[id_index] is None:
+                continue
+            result_row[prefix] = dict((suffix, values[index])
+                                      for suffix, index in fields)
         root_table_fields = result_row.pop(root_table_name)
         result_row.update(root_table_fields)
         result_rows.append(result_row)
     return result_rows
 
 
+_row_layouts = {}
+
+
+def _row_layout(keys):
+    """Group the columns of a result by the prefix of their label.
+
+    Return a list of (prefix, index of the prefix_id column or None,
+    ((suffix, index), ...)), computed once for each list of labels.
+    """
+
+    layout = _row_layouts.get(keys)
+    if layout is None:
+        # like dict(row), a repeated label keeps its first position and
+        # its last value
+        indexes = collections.OrderedDict()
+        for index, field in enumerate(keys):
+            indexes[field] = index
+
+        groups = collections.OrderedDict()
+        for field, index in indexes.items():
+            prefix, suffix = field.split('_', 1)
+            if not prefix:
+                continue
+            groups.setdefault(prefix, []).append((suffix, index))
+
+        layout = []
+        for prefix, fields in groups.items():
+            id_index = dict(fields).get('id')
+            layout.append((prefix, id_index, tuple(fields)))
+        if len(_row_layouts) >= 1000:
+            _row_layouts.clear()
+        _row_layouts[keys] = layout
+    return layout
+
+
 def _format_level_2(rows, list_embeds, embed_many):
     """
     From the _format_level_1 function we have a list of rows. Because of using
@@ -415,6 +1275,9 @@ def _format_level_2(rows, list_embeds, embed_many):
     ]
 
     This is the purpose of this function.
+
+    The embeds fetched with json_agg() by the QueryBuilder are already
+    lists in the rows, they are kept as they are.
     """
 
     def _uniqify_list(list_of_dicts):
@@ -428,6 +1291,9 @@ def _format_level_2(rows, list_embeds, embed_many):
             result.append(v)
         return result
 
+    aggregated = _aggregated_embeds(rows, list_embeds, embed_many)
+    list_embeds = [embd for embd in list_embeds if embd not in aggregated]
+
     row_ids_to_embed_values = {}
     for row in rows:
         # for each row, associate rows's id -> {all embeds values}
@@ -491,11 +1357,35 @@ def _format_level_2(rows, list_embeds, embed_many):
                     new_row[prefix][suffix] = new_row_embd_value
                 else:
                     new_row[embd] = new_row_embd_value
+        for embd in aggregated:
+            # an empty embed of a missing parent embed is still listed
+            if '.' in embd:
+                prefix, suffix = embd.split('.', 1)
+                if prefix in new_row:
+                    new_row[prefix].setdefault(suffix, [])
         # row is complete !
         result.append(new_row)
     return result
 
 
+def _aggregated_embeds(rows, list_embeds, embed_many):
+    """Return the one-to-many embeds whose values are already lists."""
+
+    aggregated = set()
+    for embd in list_embeds:
+        if not embed_many.get(embd):
+            continue
+        prefix, _, suffix = embd.rpartition('.')
+        for row in rows:
+            parent = row.get(prefix) if prefix else row
+            if isinstance(parent, dict) and isinstance(parent.get(suffix),
+                                                       list):
+                aggregated.add(embd)
+                break
+    return aggregated
+
+
+@instrumentation.timed('format')
 def format_result(rows, root_table_name, list_embeds=None, embed_many=None):
     result_rows = _format_level_1(rows, root_table_name)
 
@@ -504,6 +1394,40 @@ def format_result(rows, root_table_name, list_embeds=None, embed_many=None):
     return result_rows
 
 
+def stream_json(name, batches, meta):
+    """Response writing {name: [resources], '_meta': meta(count)} while the
+    lists of resources yielded by batches are produced, count being the
+    number of resources written."""
+
+    def generate():
+        count = 0
+        yield '{%s: [' % flask.json.dumps(name)
+        for resources in batches:
+            if not resources:
+                continue
+            chunk = ', '.join(flask.json.dumps(r) for r in resources)
+            yield ', ' + chunk if count else chunk
+            count += len(resources)
+        yield '], "_meta": %s}' % flask.json.dumps(meta(count))
+
+    return flask.Response(flask.stream_with_context(generate()),
+                          mimetype='application/json')
+
+
+def stream_result(query, name, root_table_name, list_embeds=None,
+                  embed_many=None):
+    """Streamed equivalent of jsonify()ing the format_result() of query
+    under name, with _meta written last."""
+
+    size = flask.current_app.config['STREAM_BATCH_SIZE']
+    rows = query.stream(size)
+    batches = (format_result(batch, root_table_name, list_embeds, embed_many)
+               for batch in rows)
+    return stream_json(name, batches,
+                       lambda count: {'count': query.get_number_of_rows(),
+                                      'next': None})
+
+
 def common_values_dict(user):
     """Build a basic values object used in every create method.
 
@@ -16,33 +16,79 @@
 
 
 from dci.api import v1 as api_v1
+from dci.api.v1 import utils as v1_utils
+from dci.common import cache
 from dci.common import exceptions
+from dci.common import instrumentation
+from dci.common import monitoring
 from dci.common import utils
 from dci.elasticsearch import engine as es_engine
 
 import flask
 import logging
-import time
+import signal
 import zmq
 
 from sqlalchemy import exc as sa_exc
 
+from dci import auth
+from dci import auth_mechanism
 from dci import dci_config
+from dci.db import connection
+from dci import stores
 
 zmq_sender = None
 
 
 class DciControlServer(flask.Flask):
+    app_ctx_globals_class = connection.DciAppCtxGlobals
+
     def __init__(self, conf, elastic_engine=None):
         super(DciControlServer, self).__init__(__name__)
         self.config.update(conf)
         self.url_map.strict_slashes = False
-        self.engine = dci_config.get_engine(conf)
+        self.db_provider = connection.ConnectionProvider(
+            dci_config.get_engine(conf),
+            replica_engines=dci_config.get_replica_engines(conf),
+            backoff=conf['DB_CONNECT_BACKOFF'],
+            max_backoff=conf['DB_CONNECT_MAX_BACKOFF'])
+        self.stores = stores.StoreRegistry()
+        self.roles = auth.Roles(conf['ROLES_CACHE_TTL'])
+        cache.invalidate_on_write(self.roles, auth.Roles.TABLES)
+        self.identity_cache = cache.create(conf, 'identity',
+                                           conf['IDENTITY_CACHE_TTL'])
+        cache.invalidate_on_write(self.identity_cache,
+                                  auth_mechanism.IDENTITY_TABLES)
+        self.topic_ids_cache = cache.create(conf, 'topic_ids',
+                                            conf['TOPIC_IDS_CACHE_TTL'])
+        cache.invalidate_on_write(self.topic_ids_cache,
+                                  v1_utils.TOPIC_IDS_TABLES)
+        self.verified_passwords = auth.VerifiedPasswords(
+            conf['VERIFIED_PASSWORDS_TTL'])
+        self.verified_tokens = auth.VerifiedTokens(
+            conf['VERIFIED_TOKENS_TTL'])
         self.es_engine = elastic_engine
         if not self.es_engine:
             self.es_engine = es_engine.DCIESEngine(es_host=conf['ES_HOST'],
                                                    es_port=conf['ES_PORT'])
-        self.sender = self._get_zmq_sender(conf['ZMQ_CONN'])
+        self.sender = instrumentation.TimedSender(
+            self._get_zmq_sender(conf['ZMQ_CONN']))
+
+    @property
+    def engine(self):
+        return self.db_provider.engine
+
+    @engine.setter
+    def engine(self, engine):
+        self.db_provider.engine = engine
+
+    def reload_config(self):
+        """Read the settings again. The stores are created again and the
+        verified tokens are forgotten, the database, ElasticSearch and ZMQ
+        connections keep the settings they were created with."""
+        self.config.update(dci_config.generate_conf())
+        self.stores.clear()
+        self.verified_tokens.clear()
 
     def _get_zmq_sender(self, zmq_conn):
         global zmq_sender
@@ -84,6 +130,17 @@ def handle_dbapi_exception(dbapi_exception):
     return response
 
 
+def install_reload_handler(dci_app, signum=signal.SIGHUP):
+    """Reload the configuration of dci_app when the process receives
+    signum."""
+
+    def reload_config(signum, frame):
+        dci_app.logger.warning('reloading the configuration')
+        dci_app.reload_config()
+
+    signal.signal(signum, reload_config)
+
+
 def create_app(conf, elastic_engine=None):
     dci_config.sanity_check(conf)
     dci_app = DciControlServer(conf, elastic_engine=elastic_engine)
@@ -103,28 +160,21 @@ def create_app(conf, elastic_engine=None):
         logger.setLevel(logging.DEBUG if conf['DEBUG'] else logging.WARN)
         logger.addHandler(handler)
 
+    instrumentation.init_app(dci_app)
+    monitoring.init_app(dci_app)
+
     @dci_app.before_request
     def before_request():
-        for i in range(5):
-            try:
-                flask.g.db_conn = dci_app.engine.connect()
-                break
-            except:
-                logging.warning('failed to connect to the database, '
-                                'will retry in 1 second...')
-                time.sleep(1)
-                pass
-
+        # flask.g.db_conn is checked out of the pool on first access only
         flask.g.es_conn = dci_app.es_engine
         flask.g.sender = dci_app.sender
 
     @dci_app.teardown_request
     def teardown_request(_):
         try:
-            flask.g.db_conn.close()
-        except:
+            flask.g.close_db_conn()
+        except Exception:
             logging.warning('disconnected from the database..')
-            pass
 
     # Registering REST error handler
     dci_app.register_error_handler(exceptions.DCIException,
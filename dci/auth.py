@@ -14,11 +14,22 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
 import flask
 import jwt
+from jwt import exceptions as jwt_exc
 from passlib.apps import custom_app_context as pwd_context
+import six
 
 from dci.db import models
+from dci.common import cache
 from dci.common import exceptions as exc
 from sqlalchemy import sql
 
@@ -33,9 +44,185 @@ def check_passwords_equal(password, encrypted_password):
     return pwd_context.verify(password, encrypted_password)
 
 
+class VerifiedPasswords(object):
+    """Successful password verifications, remembered for ttl seconds.
+
+    The password hashes are slow to verify on purpose. The cache is kept
+    in the process and its keys are HMACs, with a random secret, of the
+    user id, the password and its hash, so a new hash never matches.
+    """
+
+    def __init__(self, ttl):
+        self._secret = os.urandom(32)
+        self._cache = cache.TTLCache(ttl)
+
+    def _key(self, user_id, password, encrypted_password):
+        parts = [value if isinstance(value, bytes)
+                 else six.text_type(value).encode('utf-8')
+                 for value in (user_id, password, encrypted_password)]
+        return hmac.new(self._secret, b'\0'.join(parts),
+                        hashlib.sha256).hexdigest()
+
+    def check(self, user_id, password, encrypted_password):
+        if encrypted_password is None:
+            return check_passwords_equal(password, encrypted_password)
+
+        key = self._key(user_id, password, encrypted_password)
+        if self._cache.get(key):
+            return True
+        if check_passwords_equal(password, encrypted_password):
+            self._cache.set(key, True)
+            return True
+        return False
+
+    def clear(self):
+        self._cache.clear()
+
+
+_public_keys = {}
+_public_keys_lock = threading.Lock()
+
+
+def load_public_key(pem_public_key):
+    """Parse a PEM public key, once per process."""
+
+    public_key = _public_keys.get(pem_public_key)
+    if public_key is None:
+        pem = pem_public_key
+        if not isinstance(pem, bytes):
+            pem = pem.encode('utf-8')
+        public_key = serialization.load_pem_public_key(
+            pem, backend=default_backend())
+        with _public_keys_lock:
+            _public_keys[pem_public_key] = public_key
+    return public_key
+
+
 def decode_jwt(access_token, pem_public_key, audience):
-    return jwt.decode(access_token, verify=True, key=pem_public_key,
-                      audience=audience, algorithms=['RS256'])
+    """Verify and decode access_token.
+
+    pem_public_key is either a PEM public key or a list of them, the
+    token is accepted if it is signed by one of them. Listing both the
+    new and the previous key allows to rotate them.
+    """
+
+    if isinstance(pem_public_key, (list, tuple)):
+        pem_public_keys = pem_public_key
+    else:
+        pem_public_keys = [pem_public_key]
+
+    for index, pem in enumerate(pem_public_keys):
+        try:
+            return jwt.decode(access_token, verify=True,
+                              key=load_public_key(pem),
+                              audience=audience, algorithms=['RS256'])
+        except jwt_exc.DecodeError:
+            if index == len(pem_public_keys) - 1:
+                raise
+    raise jwt_exc.DecodeError('No public key configured')
+
+
+class VerifiedTokens(object):
+    """Claims of the JWT tokens already verified, kept until the tokens
+    expire and at most max_ttl seconds."""
+
+    def __init__(self, max_ttl):
+        self.max_ttl = max_ttl
+        self._cache = cache.TTLCache(max_ttl)
+
+    def decode(self, access_token, pem_public_key, audience):
+        token = access_token
+        if not isinstance(token, bytes):
+            token = token.encode('utf-8')
+        key = hashlib.sha256(token).hexdigest()
+
+        claims = self._cache.get(key)
+        if claims is None:
+            claims = decode_jwt(access_token, pem_public_key, audience)
+            ttl = self.max_ttl
+            if 'exp' in claims:
+                ttl = min(ttl, int(claims['exp']) - time.time())
+            if ttl > 0:
+                self._cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RoleTable(object):
+    """Immutable snapshot of the roles and of their permissions."""
+
+    def __init__(self, role_ids, permissions):
+        self._role_ids = role_ids
+        self._permissions = permissions
+
+    @classmethod
+    def load(cls, db_conn):
+        role_ids = {}
+        query = sql.select([models.ROLES.c.id, models.ROLES.c.label,
+                            models.ROLES.c.state])
+        for row in db_conn.execute(query):
+            # an archived role only wins if it is the only one
+            if row.label not in role_ids or row.state != 'archived':
+                role_ids[row.label] = row.id
+
+        permissions = {}
+        query = (sql.select([models.JOIN_ROLES_PERMISSIONS.c.role_id,
+                             models.PERMISSIONS.c.label])
+                 .select_from(models.JOIN_ROLES_PERMISSIONS
+                              .join(models.PERMISSIONS))
+                 .where(models.PERMISSIONS.c.state != 'archived'))
+        for row in db_conn.execute(query):
+            permissions.setdefault(row.role_id, set()).add(row.label)
+
+        return cls(role_ids, dict((role_id, frozenset(labels))
+                                  for role_id, labels in permissions.items()))
+
+    def role_id(self, label):
+        return self._role_ids[label]
+
+    def permissions(self, role_id):
+        return self._permissions.get(role_id, frozenset())
+
+
+class Roles(object):
+    """Role table of an application, loaded on first use and loaded again
+    after a write to the roles or the permissions, or after ttl seconds.
+
+    Each process has its own table, the ttl bounds how long a write made
+    by another process is ignored.
+    """
+
+    TABLES = ('roles', 'permissions', 'roles_permissions')
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._table = None
+        self._expires_at = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db_conn):
+        table = self._table
+        if table is None or self._expires_at <= time.time():
+            generation = self._generation
+            expires_at = time.time() + self.ttl
+            table = RoleTable.load(db_conn)
+            with self._lock:
+                if generation == self._generation:
+                    self._table = table
+                    self._expires_at = expires_at
+        return table
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._table = None
+
+
+def get_role_table():
+    return flask.current_app.roles.get(flask.g.db_conn)
 
 
 # This method should be deleted once permissions mechanism is
@@ -44,11 +231,7 @@ def decode_jwt(access_token, pem_public_key, audience):
 def get_role_id(label):
     """Return role id based on role label."""
 
-    query = sql.select([models.ROLES]).where(
-        models.ROLES.c.label == label
-    )
-    result = flask.g.db_conn.execute(query).fetchone()
-    return result.id
+    return get_role_table().role_id(label)
 
 
 def is_admin(user, super=False):
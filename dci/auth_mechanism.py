@@ -15,8 +15,12 @@
 # under the License.
 from datetime import datetime
 import flask
+import sqlalchemy as sa
 from sqlalchemy import exc as sa_exc
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql as pg
 from sqlalchemy import sql
+import uuid
 
 from dci import auth
 from dci.common import exceptions as dci_exc
@@ -24,27 +28,72 @@ from dci.common import signature
 from dciauth.request import AuthRequest
 from dciauth.signature import Signature
 from dci.db import models
-from dci import dci_config
+from dci.db import statements
 from dci.identity import Identity
 
 from jwt import exceptions as jwt_exc
 
+# tables read to build an identity, writing to one of them invalidates the
+# identity cache
+IDENTITY_TABLES = ('users', 'remotecis', 'feeders', 'teams',
+                   'products') + auth.Roles.TABLES
+
 
 class BaseMechanism(object):
-    def __init__(self, request):
+    def __init__(self, request, streamed_payload=False):
         self.request = request
         self.identity = None
+        # the view reads the payload as a stream, see
+        # decorators.streamed_payload
+        self.streamed_payload = streamed_payload
+        self.deferred_signature = None
 
     def authenticate(self):
         """Authenticate the user, if the user fail to authenticate then the
         method must raise an exception with proper error message."""
         pass
 
-    def identity_from_db(self, model_cls, model_constraint):
+    @staticmethod
+    def _identity_query(model_cls, lookup_columns):
         partner_team = models.TEAMS.alias('partner_team')
         product_team = models.TEAMS.alias('product_team')
 
-        query_get_identity = (
+        model_constraint = sql.or_(*[
+            model_cls.c[column] == sql.bindparam('value')
+            for column in lookup_columns
+        ])
+
+        # every team with each of the teams above it and with itself, so
+        # that the teams below a team are found whatever their depth
+        top_team = models.TEAMS.alias('top_team')
+        team_tree = (
+            sql.select([top_team.c.id.label('top_id'),
+                        top_team.c.id, top_team.c.parent_id])
+            .cte('team_tree', recursive=True)
+        )
+        child_team = models.TEAMS.alias('child_team')
+        team_tree = team_tree.union(
+            sql.select([team_tree.c.top_id,
+                        child_team.c.id, child_team.c.parent_id])
+            .where(child_team.c.parent_id == team_tree.c.id)
+        )
+        # the team of the principal row and the teams below it, the root
+        # teams for a principal without team
+        principal_teams = sql.or_(
+            team_tree.c.top_id == model_cls.c.team_id,
+            sql.and_(model_cls.c.team_id == None,  # noqa
+                     team_tree.c.parent_id == None,  # noqa
+                     team_tree.c.top_id == team_tree.c.id))
+
+        def teams_of_principal(column, label):
+            # both aggregates are sorted alike, their values match
+            return (sql.select([func.array_agg(pg.aggregate_order_by(
+                sql.cast(column, sa.Text), team_tree.c.id))])
+                .where(principal_teams)
+                .as_scalar()
+                .label(label))
+
+        return (
             sql.select(
                 [
                     model_cls,
@@ -52,6 +101,9 @@ class BaseMechanism(object):
                     models.PRODUCTS.c.id.label('product_id'),
                     models.ROLES.c.label.label('role_label'),
                     partner_team.c.state.label('partner_team_state'),
+                    teams_of_principal(team_tree.c.id, 'team_ids'),
+                    teams_of_principal(team_tree.c.parent_id,
+                                       'team_parent_ids'),
                 ]
             ).select_from(
                 model_cls.outerjoin(
@@ -80,28 +132,43 @@ class BaseMechanism(object):
             )
         )
 
-        identity = flask.g.db_conn.execute(query_get_identity).fetchone()
+    def identity_from_db(self, model_cls, lookup_columns, value):
+        """Get the active identity of model_cls whose value of one of the
+        lookup_columns is value."""
+
+        lookup_columns = tuple(lookup_columns)
+        key = '%s:%s:%s' % (model_cls.name, ','.join(lookup_columns), value)
+        return flask.current_app.identity_cache.get_or_load(
+            key,
+            lambda: self._identity_from_db(model_cls, lookup_columns, value))
+
+    def _identity_from_db(self, model_cls, lookup_columns, value):
+        query_get_identity = statements.cached(
+            ('identity', model_cls.name, lookup_columns),
+            lambda: self._identity_query(model_cls, lookup_columns))
+
+        identity = flask.g.db_conn.execute(query_get_identity,
+                                           value=value).fetchone()
         if identity is None:
             return None
 
         identity = dict(identity)
-        teams = self._teams_from_db(identity['team_id'])
+        teams = self._teams_from_row(identity.pop('team_ids'),
+                                     identity.pop('team_parent_ids'))
+        permissions = auth.get_role_table().permissions(identity['role_id'])
 
-        return Identity(identity, teams)
+        return Identity(identity, teams, permissions)
 
-    def _teams_from_db(self, team_id):
-        query = sql.select([models.TEAMS.c.id, models.TEAMS.c.parent_id]) \
-            .where(sql.or_(
-                models.TEAMS.c.parent_id == team_id,
-                models.TEAMS.c.id == team_id
-            ))
+    @staticmethod
+    def _teams_from_row(team_ids, team_parent_ids):
+        def to_uuid(value):
+            return uuid.UUID(value) if value is not None else None
 
-        result = flask.g.db_conn.execute(query).fetchall()
-        teams = [{
-            'id': row[models.TEAMS.c.id],
-            'parent_id': row[models.TEAMS.c.parent_id]
-        } for row in result]
-        return teams
+        return [{
+            'id': to_uuid(team_id),
+            'parent_id': to_uuid(parent_id)
+        } for team_id, parent_id in zip(team_ids or [],
+                                        team_parent_ids or [])]
 
 
 class BasicAuthMechanism(BaseMechanism):
@@ -122,17 +189,15 @@ class BasicAuthMechanism(BaseMechanism):
         """Check the combination username/password that is valid on the
         database.
         """
-        constraint = sql.or_(
-            models.USERS.c.name == username,
-            models.USERS.c.email == username
-        )
-
-        user = self.identity_from_db(models.USERS, constraint)
+        user = self.identity_from_db(models.USERS, ('name', 'email'),
+                                     username)
         if user is None:
             raise dci_exc.DCIException('User %s does not exists.' % username,
                                        status_code=401)
 
-        return user, auth.check_passwords_equal(password, user.password)
+        verified_passwords = flask.current_app.verified_passwords
+        return user, verified_passwords.check(user.id, password,
+                                              user.password)
 
 
 class SignatureAuthMechanism(BaseMechanism):
@@ -153,11 +218,28 @@ class SignatureAuthMechanism(BaseMechanism):
                 status_code=401)
         self.identity = identity
 
+        if self.streamed_payload:
+            self.deferred_signature = self.defer_auth_signature(
+                identity, client_info['timestamp'], their_signature)
+            return True
+
         if not self.verify_auth_signature(identity, client_info['timestamp'],
                                           their_signature):
             raise dci_exc.DCIException('Invalid signature.', status_code=401)
         return True
 
+    def defer_auth_signature(self, identity, timestamp, their_signature):
+        """Check what can be checked before the payload is read, the
+        signature itself is verified once the view has streamed it."""
+
+        if identity.api_secret is None:
+            raise dci_exc.DCIException('Client %(type)s/%(id)s does not have'
+                                       ' an API secret set' % identity,
+                                       status_code=401)
+        if not signature.is_timestamp_in_bounds(timestamp):
+            raise dci_exc.DCIException('Invalid signature.', status_code=401)
+        return DeferredSignature(self, identity, timestamp, their_signature)
+
     def get_identity(self, client_type, client_id):
         """Get an identity including its API secret
         """
@@ -170,9 +252,7 @@ class SignatureAuthMechanism(BaseMechanism):
         if identity_model is None:
             return None
 
-        constraint = identity_model.c.id == client_id
-
-        identity = self.identity_from_db(identity_model, constraint)
+        identity = self.identity_from_db(identity_model, ('id',), client_id)
         return identity
 
     def get_client_info(self):
@@ -204,7 +284,8 @@ class SignatureAuthMechanism(BaseMechanism):
                                        '401')
 
     def verify_auth_signature(self, identity, timestamp,
-                              their_signature):
+                              their_signature, payload_hash=None,
+                              check_timestamp=True):
         """Extract the values from the request, and pass them to the signature
         verification method."""
         if identity.api_secret is None:
@@ -212,6 +293,7 @@ class SignatureAuthMechanism(BaseMechanism):
                                        ' an API secret set' % identity,
                                        status_code=401)
 
+        payload = self.request.data if payload_hash is None else None
         return signature.is_valid(
             their_signature=their_signature.encode('utf-8'),
             secret=identity.api_secret.encode('utf-8'),
@@ -221,7 +303,37 @@ class SignatureAuthMechanism(BaseMechanism):
             timestamp=timestamp,
             url=self.request.path.encode('utf-8'),
             query_string=self.request.query_string,
-            payload=self.request.data)
+            payload=payload,
+            payload_hash=payload_hash,
+            check_timestamp=check_timestamp)
+
+
+class DeferredSignature(object):
+    """Signature of a request whose payload is hashed while the view reads
+    it from stream."""
+
+    def __init__(self, mechanism, identity, timestamp, their_signature):
+        self._mechanism = mechanism
+        self._identity = identity
+        self._timestamp = timestamp
+        self._their_signature = their_signature
+        self._valid = None
+        self.stream = signature.PayloadHasher(mechanism.request.stream)
+
+    def verify(self, rollback=None):
+        """Raise a 401 error if the signature is invalid, after calling
+        rollback to undo what the view did with the payload."""
+
+        if self._valid is None:
+            # the timestamp was checked before the payload was read
+            self._valid = self._mechanism.verify_auth_signature(
+                self._identity, self._timestamp, self._their_signature,
+                payload_hash=self.stream.payload_hash(),
+                check_timestamp=False)
+            if not self._valid and rollback is not None:
+                rollback()
+        if not self._valid:
+            raise dci_exc.DCIException('Invalid signature.', status_code=401)
 
 
 class HmacMechanism(BaseMechanism):
@@ -253,8 +365,8 @@ class HmacMechanism(BaseMechanism):
         identity_model = allowed_types_model.get(client_info['client_type'])
         if identity_model is None:
             return None
-        constraint = identity_model.c.id == client_info['client_id']
-        return self.identity_from_db(identity_model, constraint)
+        return self.identity_from_db(identity_model, ('id',),
+                                     client_info['client_id'])
 
 
 class OpenIDCAuth(BaseMechanism):
@@ -264,11 +376,10 @@ class OpenIDCAuth(BaseMechanism):
             return False
         bearer, token = auth_header
 
-        conf = dci_config.generate_conf()
+        conf = flask.current_app.config
         try:
-            decoded_token = auth.decode_jwt(token,
-                                            conf['SSO_PUBLIC_KEY'],
-                                            conf['SSO_CLIENT_ID'])
+            decoded_token = flask.current_app.verified_tokens.decode(
+                token, conf['SSO_PUBLIC_KEY'], conf['SSO_CLIENT_ID'])
         except jwt_exc.DecodeError:
             raise dci_exc.DCIException('Invalid JWT token.', status_code=401)
         except jwt_exc.ExpiredSignatureError:
@@ -284,12 +395,9 @@ class OpenIDCAuth(BaseMechanism):
 
     def _get_user_from_sso_username(self, sso_username):
         """Given the sso's username, get the associated user."""
-        constraint = sql.or_(
-            models.USERS.c.sso_username == sso_username,
-            models.USERS.c.email == sso_username
-        )
-
-        identity = self.identity_from_db(models.USERS, constraint)
+        identity = self.identity_from_db(models.USERS,
+                                         ('sso_username', 'email'),
+                                         sso_username)
         return identity
 
     def _create_user_and_get(self, decoded_token):
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import time
+import weakref
+
+from six.moves import cPickle as pickle
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import expression
+
+
+class Cache(object):
+
+    def get_or_load(self, key, loader):
+        """Return the cached value of key, or store and return the result
+        of loader() unless it is None.
+
+        A value loaded while the cache is cleared is not stored, it may
+        have been read before the write which cleared the cache.
+        """
+
+        value = self.get(key)
+        if value is None:
+            generation = self.generation
+            value = loader()
+            if value is not None:
+                self.set(key, value, generation=generation)
+        return value
+
+
+class TTLCache(Cache):
+    """Thread safe in-process cache whose entries expire after ttl
+    seconds."""
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.generation = 0
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._evict()
+            self._data[key] = (value, time.time() + ttl)
+
+    def _evict(self):
+        now = time.time()
+        for key, entry in list(self._data.items()):
+            if entry[1] <= now:
+                self._data.pop(key, None)
+        if len(self._data) >= self.maxsize:
+            self._data.clear()
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+
+class RedisCache(Cache):
+    """Cache shared by all the API processes through Redis.
+
+    Entries are tagged with the generation they were loaded in, clear()
+    increments the generation so that every process stops using them.
+    """
+
+    def __init__(self, url, namespace, ttl):
+        # redis is only required when a shared cache is configured
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.StrictRedis.from_url(url)
+        self._namespace = 'dci:%s' % namespace
+        self._generation_key = '%s:generation' % self._namespace
+
+    def _key(self, key):
+        return '%s:%s' % (self._namespace, key)
+
+    @property
+    def generation(self):
+        return int(self._redis.get(self._generation_key) or 0)
+
+    def get(self, key, default=None):
+        pipe = self._redis.pipeline()
+        pipe.get(self._generation_key)
+        pipe.get(self._key(key))
+        generation, data = pipe.execute()
+        if data is None:
+            return default
+        entry_generation, value = pickle.loads(data)
+        if entry_generation != int(generation or 0):
+            return default
+        return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if generation is None:
+            generation = self.generation
+        data = pickle.dumps((generation, value), pickle.HIGHEST_PROTOCOL)
+        self._redis.setex(self._key(key), int(max(ttl, 1)), data)
+
+    def delete(self, key):
+        self._redis.delete(self._key(key))
+
+    def clear(self):
+        self._redis.incr(self._generation_key)
+
+
+def create(conf, namespace, ttl):
+    """Return a Redis cache when CACHE_REDIS_URL is set, an in-process
+    cache otherwise."""
+
+    if conf.get('CACHE_REDIS_URL'):
+        return RedisCache(conf['CACHE_REDIS_URL'], namespace, ttl)
+    return TTLCache(ttl)
+
+
+_watchers = []
+_watchers_lock = threading.Lock()
+
+
+def invalidate_on_write(cache, tables):
+    """Clear cache when a statement writes to one of tables, and again
+    when its transaction is committed, so that a request reading the
+    previous values in between does not keep them in the cache.
+
+    Only the statements executed by the engines of this process are seen.
+    A RedisCache is cleared for every process, but a TTLCache is not
+    cleared by the writes of the other processes nor by the writes made
+    outside of the API: its entries are only refreshed when they expire.
+    """
+
+    with _watchers_lock:
+        _watchers[:] = [w for w in _watchers if w[0]() is not None]
+        _watchers.append((weakref.ref(cache), frozenset(tables)))
+        if not event.contains(Engine, 'after_execute', _after_execute):
+            event.listen(Engine, 'after_execute', _after_execute)
+            event.listen(Engine, 'commit', _after_commit)
+            event.listen(Engine, 'rollback', _after_rollback)
+
+
+def _after_execute(conn, clauseelement, multiparams, params, result):
+    if not isinstance(clauseelement, expression.UpdateBase):
+        return
+    table = getattr(clauseelement.table, 'name', None)
+    for cache_ref, tables in list(_watchers):
+        cache = cache_ref()
+        if cache is not None and table in tables:
+            cache.clear()
+            conn.info.setdefault('dci_dirty_caches', set()).add(cache_ref)
+
+
+def _after_commit(conn):
+    for cache_ref in conn.info.pop('dci_dirty_caches', ()):
+        cache = cache_ref()
+        if cache is not None:
+            cache.clear()
+
+
+def _after_rollback(conn):
+    conn.info.pop('dci_dirty_caches', None)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import functools
+import time
+
+import flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from dci.common import monitoring
+
+CATEGORIES = ('db', 'swift', 'es', 'zmq', 'format')
+
+
+class RequestTimings(object):
+    """Time spent by a request in the database, Swift, ElasticSearch, ZMQ
+    and in the formatting of the results."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.durations = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+
+    def record(self, category, duration):
+        self.durations[category] += duration
+        self.counts[category] += 1
+
+    def total(self):
+        return time.time() - self.start
+
+    def to_header(self):
+        metrics = []
+        for category in CATEGORIES:
+            if category not in self.counts:
+                continue
+            metrics.append('%s;dur=%.2f;desc="%d calls"' % (
+                category, self.durations[category] * 1000,
+                self.counts[category]))
+        metrics.append('total;dur=%.2f' % (self.total() * 1000))
+        return ', '.join(metrics)
+
+
+def get_timings():
+    if not flask.has_app_context():
+        return None
+    return getattr(flask.g, 'timings', None)
+
+
+def record(category, duration):
+    monitoring.observe_backend(category, duration)
+    timings = get_timings()
+    if timings is not None:
+        timings.record(category, duration)
+
+
+def timed(category):
+    """Decorator adding the duration of each call to the current request."""
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                record(category, time.time() - start)
+        return wrapper
+    return decorator
+
+
+class TimedSender(object):
+    """Wrap a ZMQ socket to time the messages sent."""
+
+    def __init__(self, socket):
+        self._socket = socket
+
+    @timed('zmq')
+    def send_json(self, *args, **kwargs):
+        monitoring.ZMQ_MESSAGES.inc()
+        return self._socket.send_json(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('dci_query_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = conn.info['dci_query_start'].pop()
+    record('db', time.time() - start)
+
+
+def init_app(app):
+    if not event.contains(Engine, 'before_cursor_execute',
+                          _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_timings():
+        flask.g.timings = RequestTimings()
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = get_timings()
+        if timings is None:
+            return response
+        header = timings.to_header()
+        response.headers['Server-Timing'] = header
+        threshold = app.config['SLOW_REQUEST_THRESHOLD']
+        if threshold is not None and timings.total() * 1000 > threshold:
+            app.logger.warning('slow request %s %s: %s',
+                               flask.request.method, flask.request.full_path,
+                               header)
+        return response
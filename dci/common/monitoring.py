@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import time
+
+import flask
+import prometheus_client
+from prometheus_client import multiprocess
+
+# When the API runs in several processes (mod_wsgi, gunicorn...), the
+# prometheus_multiproc_dir environment variable must point to a directory
+# shared by all the workers, and emptied when the service starts.
+MULTIPROC_DIR_ENV = 'prometheus_multiproc_dir'
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+
+REQUEST_LATENCY = prometheus_client.Histogram(
+    'dci_request_duration_seconds', 'API request latency',
+    ['method', 'endpoint'])
+REQUEST_COUNT = prometheus_client.Counter(
+    'dci_requests_total', 'API requests by status code',
+    ['method', 'endpoint', 'status'])
+BACKEND_LATENCY = prometheus_client.Histogram(
+    'dci_backend_duration_seconds',
+    'Latency of the calls to the database, Swift, ElasticSearch and ZMQ',
+    ['backend'])
+ZMQ_MESSAGES = prometheus_client.Counter(
+    'dci_zmq_messages_sent_total', 'Messages sent to the worker')
+DB_POOL_CHECKED_OUT = prometheus_client.Gauge(
+    'dci_db_pool_checked_out', 'Database connections in use',
+    multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = prometheus_client.Gauge(
+    'dci_db_pool_overflow', 'Database connections opened over the pool size',
+    multiprocess_mode='livesum')
+
+
+def observe_backend(backend, duration):
+    BACKEND_LATENCY.labels(backend).observe(duration)
+
+
+def generate_latest():
+    """Return the metrics of all the API processes in the text format."""
+
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry)
+
+
+def init_app(app):
+
+    @app.before_request
+    def start_request_clock():
+        flask.g.request_start = time.time()
+
+    @app.after_request
+    def record_request(response):
+        request_start = getattr(flask.g, 'request_start', None)
+        if request_start is None:
+            return response
+
+        rule = flask.request.url_rule
+        endpoint = rule.rule if rule is not None else 'unknown'
+        method = flask.request.method
+        REQUEST_LATENCY.labels(method, endpoint).observe(
+            time.time() - request_start)
+        REQUEST_COUNT.labels(method, endpoint, response.status_code).inc()
+
+        pool = app.engine.pool
+        if hasattr(pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+            DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+        return response
@@ -91,6 +91,8 @@ INVALID_JOB = 'not a valid job id'
 INVALID_JOB_STATE = 'not a valid jobstate id'
 INVALID_OFFSET = 'not a valid offset integer (must be greater than 0)'
 INVALID_LIMIT = 'not a valid limit integer (must be greater than 0)'
+INVALID_CURSOR = 'not a valid cursor'
+INVALID_COUNT = 'not a valid count (must be exact, estimate or none)'
 
 INVALID_REQUIRED = 'required key not provided'
 INVALID_OBJECT = 'not a valid object'
@@ -162,9 +164,14 @@ args = Schema({
                                              msg=INVALID_LIMIT),
     v.Optional('offset', default=None): v.All(v.Coerce(int), v.Range(0),
                                               msg=INVALID_OFFSET),
+    v.Optional('cursor', default=None): v.All(six.text_type,
+                                              msg=INVALID_CURSOR),
+    v.Optional('count', default='exact'): v.Any('exact', 'estimate', 'none',
+                                                msg=INVALID_COUNT),
     v.Optional('sort', default=[]): split_coerce,
     v.Optional('where', default=[]): split_coerce,
-    v.Optional('embed', default=[]): split_coerce
+    v.Optional('embed', default=[]): split_coerce,
+    v.Optional('fields', default=[]): split_coerce
 }, extra=v.REMOVE_EXTRA)
 
 ###############################################################################
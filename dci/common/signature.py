@@ -44,10 +44,39 @@ def format_for_signature(http_verb, content_type, timestamp, url,
     ))
 
 
+class PayloadHasher(object):
+    """Wrap a stream to compute the SHA-256 of what is read from it."""
+
+    def __init__(self, stream, chunk_size=65536):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._sha256 = hashlib.sha256()
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self._sha256.update(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(self._chunk_size)
+            if not data:
+                break
+            yield data
+
+    def payload_hash(self):
+        """Read what is left of the stream and return the hash."""
+
+        while self.read(self._chunk_size):
+            pass
+        return self._sha256.hexdigest().encode('utf-8')
+
+
 def gen_signature(secret, http_verb, content_type, timestamp, url,
-                  query_string, payload):
+                  query_string, payload=None, payload_hash=None):
     """Generates a signature compatible with DCI for the parameters passed"""
-    payload_hash = hashlib.sha256(payload).hexdigest().encode('utf-8')
+    if payload_hash is None:
+        payload_hash = hashlib.sha256(payload).hexdigest().encode('utf-8')
     stringtosign = format_for_signature(
         http_verb=http_verb,
         content_type=content_type,
@@ -79,14 +108,16 @@ def is_timestamp_in_bounds(timestamp, max_drift=timedelta(minutes=5),
 
 def is_valid(their_signature,
              secret, http_verb, content_type, timestamp, url,
-             query_string, payload):
+             query_string, payload=None, payload_hash=None,
+             check_timestamp=True):
     """Verifies the remote signature against a locally computed signature and
     ensures the timestamp lies within ±5 minutes of current time.
 
     Returns True if signature is valid and timestamp within defined bounds"""
     local_signature = gen_signature(secret, http_verb, content_type, timestamp,
-                                    url, query_string, payload).encode('utf-8')
+                                    url, query_string, payload,
+                                    payload_hash).encode('utf-8')
 
     # TODO(all): differentiate the expiration and the comparison error
-    return is_timestamp_in_bounds(timestamp) and \
+    return (not check_timestamp or is_timestamp_in_bounds(timestamp)) and \
         compare_digest(their_signature, local_signature)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import itertools
+import logging
+import threading
+import time
+
+import flask
+import six
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import sql
+
+from dci.common import exceptions as dci_exc
+
+LOG = logging.getLogger(__name__)
+
+
+def add_pre_ping(engine):
+    """Test each connection when it is checked out of the pool.
+
+    A connection killed by the database (restart, failover, idle timeout)
+    is invalidated and transparently replaced instead of failing the
+    request that picked it up.
+    """
+
+    @event.listens_for(engine, 'engine_connect')
+    def ping_connection(connection, branch):
+        if branch:
+            return
+
+        save_should_close_with_result = connection.should_close_with_result
+        connection.should_close_with_result = False
+        try:
+            connection.scalar(sql.select([1]))
+        except sa_exc.DBAPIError as err:
+            if err.connection_invalidated:
+                connection.scalar(sql.select([1]))
+            else:
+                raise
+        finally:
+            connection.should_close_with_result = save_should_close_with_result
+
+    return engine
+
+
+class ConnectionProvider(object):
+    """Check out pooled connections and never block a request thread.
+
+    If the pool is exhausted or the database cannot be reached, a 503 is
+    raised right away. After a failed connection attempt, further attempts
+    are refused until a backoff delay has expired. The delay doubles with
+    each consecutive failure, up to max_backoff seconds.
+    """
+
+    def __init__(self, engine, replica_engines=None, backoff=0.5,
+                 max_backoff=8):
+        self.engine = engine
+        self.replica_engines = replica_engines or []
+        self._replicas = itertools.cycle(self.replica_engines)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0
+
+    def _unavailable(self, message):
+        return dci_exc.DCIException(message, status_code=503)
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            delay = min(self.max_backoff,
+                        self.backoff * 2 ** (self._failures - 1))
+            self._retry_at = time.time() + delay
+        return delay
+
+    def _record_success(self):
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+                self._retry_at = 0
+
+    def connect(self):
+        if time.time() < self._retry_at:
+            raise self._unavailable('Database unavailable, retry later.')
+
+        try:
+            connection = self.engine.connect()
+        except sa_exc.TimeoutError:
+            LOG.warning('database connection pool exhausted')
+            raise self._unavailable('Too many concurrent requests, '
+                                    'retry later.')
+        except sa_exc.DBAPIError:
+            delay = self._record_failure()
+            LOG.warning('failed to connect to the database, next attempt '
+                        'allowed in %s seconds', delay)
+            raise self._unavailable('Database unavailable, retry later.')
+
+        self._record_success()
+        return connection
+
+    def connect_replica(self):
+        """Return a connection to the next replica, or to the primary if
+        no replica is configured or reachable."""
+
+        for _ in range(len(self.replica_engines)):
+            engine = next(self._replicas)
+            try:
+                return engine.connect()
+            except (sa_exc.TimeoutError, sa_exc.DBAPIError):
+                LOG.warning('failed to connect to replica %s', engine.url)
+        return self.connect()
+
+    def connect_for_request(self, method):
+        """Read-only requests are routed to the replicas, anything else
+        goes straight to the primary."""
+
+        if self.replica_engines and method in ('GET', 'HEAD'):
+            return RoutingConnection(self)
+        return self.connect()
+
+
+class RoutingConnection(object):
+    """Send SELECT statements to a replica until the request writes.
+
+    The first statement that is not a plain SELECT, or the first explicit
+    transaction, switches the connection to the primary. Every statement
+    after that also goes to the primary, so the request reads its own
+    writes.
+    """
+
+    def __init__(self, provider):
+        self._provider = provider
+        self._replica = None
+        self._primary = None
+
+    @property
+    def on_primary(self):
+        return self._primary is not None
+
+    def _get_primary(self):
+        if self._primary is None:
+            self._primary = self._provider.connect()
+        return self._primary
+
+    def _get_replica(self):
+        if self._replica is None:
+            self._replica = self._provider.connect_replica()
+        return self._replica
+
+    def _connection_for(self, statement):
+        # the statements which only read without being a SELECT, like
+        # EXPLAIN, have an is_readonly attribute
+        is_select = (isinstance(statement, sql.expression.Select) or
+                     getattr(statement, 'is_readonly', False) or
+                     (isinstance(statement, six.string_types) and
+                      statement.lstrip()[:6].upper() == 'SELECT'))
+        if is_select and not self.on_primary:
+            return self._get_replica()
+        return self._get_primary()
+
+    def execute(self, statement, *multiparams, **params):
+        connection = self._connection_for(statement)
+        return connection.execute(statement, *multiparams, **params)
+
+    def scalar(self, statement, *multiparams, **params):
+        connection = self._connection_for(statement)
+        return connection.scalar(statement, *multiparams, **params)
+
+    def execution_options(self, **options):
+        """Return a connection with options for the SELECT statements,
+        on the replica until the request writes, on the primary after."""
+
+        if self.on_primary:
+            return self._primary.execution_options(**options)
+        return self._get_replica().execution_options(**options)
+
+    def begin(self):
+        return self._get_primary().begin()
+
+    def close(self):
+        for connection in (self._replica, self._primary):
+            if connection is not None:
+                connection.close()
+        self._replica = self._primary = None
+
+
+class DciAppCtxGlobals(flask.ctx._AppCtxGlobals):
+    """flask.g that checks out a database connection on first use."""
+
+    @property
+    def db_conn(self):
+        if '_db_conn' not in self.__dict__:
+            provider = flask.current_app.db_provider
+            method = (flask.request.method if flask.has_request_context()
+                      else None)
+            self.__dict__['_db_conn'] = provider.connect_for_request(method)
+        return self.__dict__['_db_conn']
+
+    @db_conn.setter
+    def db_conn(self, connection):
+        self.__dict__['_db_conn'] = connection
+
+    def close_db_conn(self):
+        connection = self.__dict__.pop('_db_conn', None)
+        if connection is not None:
+            connection.close()
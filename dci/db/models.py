@@ -65,6 +65,9 @@ COMPONENTS = sa.Table(
     sa.UniqueConstraint('name', 'topic_id',
                         name='components_name_topic_id_key'),
     sa.Index('components_topic_id_idx', 'topic_id'),
+    # used by the name prefix filters whatever the collation
+    sa.Index('components_name_pattern_idx', 'name',
+             postgresql_ops={'name': 'text_pattern_ops'}),
     sa.Column('state', STATES, default='active')
 )
 
@@ -242,7 +245,9 @@ JOBS = sa.Table(
               sa.ForeignKey('jobs.id'),
               nullable=True, default=None),
     sa.Index('jobs_previous_job_id_idx', 'previous_job_id'),
-    sa.Column('state', STATES, default='active')
+    sa.Column('state', STATES, default='active'),
+    sa.Index('jobs_created_at_id_idx', 'created_at', 'id'),
+    sa.Index('jobs_status_created_at_idx', 'status', 'created_at')
 )
 
 TESTS_RESULTS = sa.Table(
@@ -328,7 +333,8 @@ JOBSTATES = sa.Table(
     sa.Column('team_id', pg.UUID(as_uuid=True),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
               nullable=False),
-    sa.Index('jobstates_team_id_idx', 'team_id')
+    sa.Index('jobstates_team_id_idx', 'team_id'),
+    sa.Index('jobstates_created_at_id_idx', 'created_at', 'id')
 )
 
 JOIN_REMOTECIS_RCONFIGURATIONS = sa.Table(
@@ -392,7 +398,8 @@ FILES = sa.Table(
     sa.Index('files_job_id_idx', 'job_id'),
     sa.Column('state', STATES, default='active'),
     sa.Column('etag', sa.String(40), nullable=False, default=utils.gen_etag,
-              onupdate=utils.gen_etag)
+              onupdate=utils.gen_etag),
+    sa.Index('files_created_at_id_idx', 'created_at', 'id')
 )
 
 FILES_EVENTS = sa.Table(
@@ -478,7 +485,8 @@ LOGS = sa.Table(
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
               nullable=False),
     sa.Index('logs_team_id_idx', 'team_id'),
-    sa.Column('action', sa.Text, nullable=False)
+    sa.Column('action', sa.Text, nullable=False),
+    sa.Index('logs_created_at_id_idx', 'created_at', 'id')
 )
 
 ISSUES = sa.Table(
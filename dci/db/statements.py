@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Statements built once per process and compiled once per engine.
+
+The statements executed on every request are built with bind parameters
+by cached(), and the engines use COMPILED_CACHE as their compiled_cache
+execution option, so their SQL is only generated on first use.
+
+The list queries built by QueryBuilder depend on the request arguments,
+they are kept by cached_shape() in a bounded cache instead.
+"""
+
+import collections
+import threading
+
+_lock = threading.Lock()
+_statements = {}
+_cached_ids = set()
+_shapes = collections.OrderedDict()
+
+
+def cached(key, builder):
+    """Return the statement stored under key, building it on first use.
+
+    The statement must only depend on the key: the values are given as
+    bind parameters when executing it.
+    """
+
+    statement = _statements.get(key)
+    if statement is None:
+        with _lock:
+            statement = _statements.get(key)
+            if statement is None:
+                statement = builder()
+                _statements[key] = statement
+                _cached_ids.add(id(statement))
+    return statement
+
+
+def cached_shape(key, builder, maxsize):
+    """Return the statement stored under key like cached(), for the keys
+    which depend on the requests.
+
+    At most maxsize statements are kept, the least recently used one is
+    forgotten when a new one does not fit.
+    """
+
+    with _lock:
+        statement = _shapes.pop(key, None)
+        if statement is not None:
+            _shapes[key] = statement
+            return statement
+
+    statement = builder()
+    with _lock:
+        statement = _shapes.pop(key, statement)
+        _shapes[key] = statement
+        _cached_ids.add(id(statement))
+        while len(_shapes) > maxsize:
+            _, evicted = _shapes.popitem(last=False)
+            _cached_ids.discard(id(evicted))
+            COMPILED_CACHE.discard(id(evicted))
+    return statement
+
+
+class CompiledCache(object):
+    """compiled_cache which only keeps the statements built by cached().
+
+    The other statements are built again for each request, storing them
+    would only grow the cache.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        self._keys = collections.defaultdict(list)
+
+    def get(self, key, default=None):
+        return self._compiled.get(key, default)
+
+    def __setitem__(self, key, compiled):
+        if id(key[1]) in _cached_ids:
+            self._compiled[key] = compiled
+            self._keys[id(key[1])].append(key)
+
+    def discard(self, statement_id):
+        """Forget the compiled forms of the statement of statement_id."""
+
+        for key in self._keys.pop(statement_id, []):
+            self._compiled.pop(key, None)
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def clear(self):
+        self._compiled.clear()
+        self._keys.clear()
+
+
+COMPILED_CACHE = CompiledCache()
@@ -17,7 +17,9 @@
 import os
 import sys
 
+from dci.db import connection
 from dci.db import models
+from dci.db import statements
 from dci.stores import swift
 
 import flask
@@ -32,31 +34,49 @@ def generate_conf():
     return conf
 
 
-def get_engine(conf):
+def get_engine(conf, uri=None):
     sa_engine = sqlalchemy.create_engine(
-        conf['SQLALCHEMY_DATABASE_URI'],
+        uri or conf['SQLALCHEMY_DATABASE_URI'],
         pool_size=conf['SQLALCHEMY_POOL_SIZE'],
         max_overflow=conf['SQLALCHEMY_MAX_OVERFLOW'],
+        pool_timeout=conf['SQLALCHEMY_POOL_TIMEOUT'],
         encoding='utf8',
         convert_unicode=conf['SQLALCHEMY_NATIVE_UNICODE'],
         echo=conf['SQLALCHEMY_ECHO'])
-    return sa_engine
+    sa_engine.update_execution_options(
+        compiled_cache=statements.COMPILED_CACHE)
+    return connection.add_pre_ping(sa_engine)
 
 
-def get_store(container):
-    conf = generate_conf()
+def get_replica_engines(conf):
+    return [get_engine(conf, uri)
+            for uri in conf['SQLALCHEMY_REPLICA_DATABASE_URIS']]
+
+
+def _build_store(conf, store_cls, container):
     configuration = {
         'os_username': conf['STORE_USERNAME'],
         'os_password': conf['STORE_PASSWORD'],
         'os_tenant_name': conf['STORE_TENANT_NAME'],
         'os_auth_url': conf['STORE_AUTH_URL'],
+        'pool_size': conf['STORE_POOL_SIZE'],
+        'token_ttl': conf['STORE_TOKEN_TTL'],
     }
     if container == 'files':
         configuration['container'] = conf['STORE_FILES_CONTAINER']
     elif container == 'components':
         configuration['container'] = conf['STORE_COMPONENTS_CONTAINER']
-    stores_engine = swift.Swift(configuration)
-    return stores_engine
+    return store_cls(configuration)
+
+
+def get_store(container):
+    app = flask.current_app
+    # NOTE: the store class is part of the key, so that a mocked class
+    # does not reuse a real store and the other way around
+    store_cls = swift.Swift
+    return app.stores.get(
+        (container, store_cls),
+        lambda: _build_store(app.config, store_cls, container))
 
 
 def sanity_check(conf):
@@ -61,13 +61,41 @@ def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_class = _get_auth_class_from_headers(flask.request.headers)
-        auth_scheme = auth_class(flask.request)
+        auth_scheme = auth_class(
+            flask.request,
+            streamed_payload=getattr(f, 'streamed_payload', False))
         auth_scheme.authenticate()
-        return f(auth_scheme.identity, *args, **kwargs)
+
+        deferred_signature = auth_scheme.deferred_signature
+        if deferred_signature is None:
+            return f(auth_scheme.identity, *args, **kwargs)
+
+        flask.g.deferred_signature = deferred_signature
+        try:
+            response = f(auth_scheme.identity, *args, **kwargs)
+        except Exception:
+            # an unauthenticated client must only get a 401
+            deferred_signature.verify()
+            raise
+        deferred_signature.verify()
+        return response
 
     return decorated
 
 
+def streamed_payload(f):
+    """Mark a view which reads the request payload as a stream.
+
+    For signed requests the payload is then hashed while the view reads
+    it, instead of being loaded in memory to verify the signature first.
+    The view must call dci.stores.files.verify_streamed_payload() once it
+    has stored the payload, before any other side effect.
+    """
+
+    f.streamed_payload = True
+    return f
+
+
 def has_role(role_labels):
     """Decorator to ensure authentified entity has proper permission."""
 
@@ -17,6 +17,8 @@
 from elasticsearch import Elasticsearch
 from elasticsearch import exceptions
 
+from dci.common import instrumentation
+
 
 class DCIESEngine(object):
     def __init__(self, es_host, es_port, index='dci', timeout=30):
@@ -25,14 +27,17 @@ class DCIESEngine(object):
                                    timeout=timeout)
         self._conn.indices.create(index=self._index, ignore=400)
 
+    @instrumentation.timed('es')
     def index(self, document):
         return self._conn.index(index=self._index, doc_type='logs',
                                 id=document['id'], body=document)
 
+    @instrumentation.timed('es')
     def update_sequence(self, sequence, doc_type='logs'):
         return self._conn.index(index=self._index, doc_type=doc_type,
                                 id='sequence', body={'sequence': sequence})
 
+    @instrumentation.timed('es')
     def get_last_sequence(self, doc_type='logs'):
         try:
             res = self._conn.get(index=self._index,
@@ -43,6 +48,7 @@ class DCIESEngine(object):
             self.update_sequence(0, doc_type)
             return 0
 
+    @instrumentation.timed('es')
     def get(self, id, team_id=None):
         res = self._conn.get(index=self.esindex, doc_type='logs', id=id)
         if team_id:
@@ -51,12 +57,14 @@ class DCIESEngine(object):
                     res = {}
         return res
 
+    @instrumentation.timed('es')
     def delete(self, id):
         try:
             return self._conn.delete(index=self._index, doc_type='logs', id=id)
         except exceptions.NotFoundError:
             pass
 
+    @instrumentation.timed('es')
     def list(self, include=None, exclude=None, size=64):
 
         include = include or ['id']
@@ -79,10 +87,12 @@ class DCIESEngine(object):
         else:
             return None
 
+    @instrumentation.timed('es')
     def refresh(self):
         return self._conn.indices.refresh(index=self._index,
                                           force=True)
 
+    @instrumentation.timed('es')
     def search_content(self, pattern, team_id=None):
         if team_id:
             query = {
@@ -19,10 +19,12 @@ class Identity:
     """Class that offers helper methods to simplify permission management
     """
 
-    def __init__(self, user, teams):
+    def __init__(self, user, teams, permissions=frozenset()):
         for key in user.keys():
             setattr(self, key, user[key])
 
+        self.permissions = permissions
+
         # TODO: replace user['role_label'] with user['role']['label']
         self.role_label = user['role_label']
         self.team = self._get_user_team(user, teams)
@@ -50,10 +52,24 @@ class Identity:
                 return team
 
     def _get_partner_teams(self, user, teams):
-        partner_teams = []
+        """Return the teams below the user team, whatever their depth, or
+        the root teams for a user without team."""
+
+        children = {}
         for team in teams:
-            if user['team_id'] == team['parent_id']:
-                partner_teams.append(team)
+            children.setdefault(team['parent_id'], []).append(team)
+        if user['team_id'] is None:
+            return children.get(None, [])
+
+        partner_teams = []
+        seen = set([user['team_id']])
+        parent_ids = [user['team_id']]
+        while parent_ids:
+            for team in children.get(parent_ids.pop(), []):
+                if team['id'] not in seen:
+                    seen.add(team['id'])
+                    partner_teams.append(team)
+                    parent_ids.append(team['id'])
         return partner_teams
 
     def is_member_of(self, team):
@@ -112,3 +128,8 @@ class Identity:
         """Ensure ther resource has the role FEEDER."""
 
         return self.role_label == 'FEEDER'
+
+    def has_permission(self, label):
+        """Ensure the role of the resource grants the permission."""
+
+        return label in self.permissions
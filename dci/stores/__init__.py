@@ -14,6 +14,32 @@
 # limitations under the License.
 
 
+import threading
+
+
+class StoreRegistry(object):
+    """Stores of an application, created on first use and then shared by
+    the requests, so that their connections and tokens are reused."""
+
+    def __init__(self):
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, builder):
+        store = self._stores.get(key)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(key)
+                if store is None:
+                    store = builder()
+                    self._stores[key] = store
+        return store
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+
 class Store(object):
 
     def __init__(self, conf):
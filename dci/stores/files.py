@@ -15,6 +15,8 @@
 # under the License.
 
 
+import flask
+
 from dci.api.v1.utils import log
 
 
@@ -28,6 +30,12 @@ def get_stream_or_content_from_request(request):
     retrieve the data from flask.request.data where it has been stored.
     """
 
+    deferred_signature = getattr(flask.g, 'deferred_signature', None)
+    if deferred_signature is not None:
+        log().info('Storing file content using request stream, the '
+                   'signature is verified while streaming.')
+        return deferred_signature.stream
+
     if request.stream.tell():
         log().info(
             'Request stream already consumed. Storing file content '
@@ -38,3 +46,12 @@ def get_stream_or_content_from_request(request):
         log().info(
             'Storing file content using request stream.')
         return request.stream
+
+
+def verify_streamed_payload(rollback):
+    """Verify the signature of a payload read as a stream, calling rollback
+    to remove what was stored when it is invalid."""
+
+    deferred_signature = getattr(flask.g, 'deferred_signature', None)
+    if deferred_signature is not None:
+        deferred_signature.verify(rollback)
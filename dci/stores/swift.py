@@ -15,11 +15,54 @@
 
 from dci import stores
 from dci.common import exceptions
+from dci.common import instrumentation
 
+import contextlib
 import os
+import threading
+import time
+
+from six.moves import queue
 import swiftclient
 
 
+class _PooledBody(object):
+    """Body of a downloaded object, which gives its connection back to
+    the pool once read or closed."""
+
+    def __init__(self, body, release):
+        self._body = body
+        self._release = release
+
+    def _done(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+    def read(self, size=None):
+        if size is None:
+            data = self._body.read()
+        else:
+            data = self._body.read(size)
+        if not data or size is None:
+            self._done()
+        return data
+
+    def __iter__(self):
+        try:
+            for chunk in self._body:
+                yield chunk
+        finally:
+            self._done()
+
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._done()
+
+
 class Swift(stores.Store):
 
     def __init__(self, conf):
@@ -32,7 +75,14 @@ class Swift(stores.Store):
         self.os_auth_url = conf.get('os_auth_url',
                                     os.getenv('OS_AUTH_URL'))
         self.container = conf.get('container')
-        self.connection = self.get_connection()
+        self.token_ttl = conf.get('token_ttl', 3000)
+        # idle connections, the Swift client connections are not thread
+        # safe so each one is used by a single request at a time
+        self._pool = queue.LifoQueue(conf.get('pool_size', 10))
+        # (storage url, token, expiration) shared by the connections
+        self._auth = None
+        self._auth_lock = threading.Lock()
+        self._containers = set()
 
     def get_connection(self):
         return swiftclient.client.Connection(auth_version='2',
@@ -41,32 +91,100 @@ class Swift(stores.Store):
                                              tenant_name=self.os_tenant_name,
                                              authurl=self.os_auth_url)
 
+    def _authenticate(self, connection):
+        """Give the shared token to connection, authenticating again if it
+        is about to expire."""
+
+        auth = self._auth
+        if auth is None or auth[2] <= time.time():
+            with self._auth_lock:
+                auth = self._auth
+                if auth is None or auth[2] <= time.time():
+                    url, token = connection.get_auth()
+                    auth = (url, token, time.time() + self.token_ttl)
+                    self._auth = auth
+        connection.url, connection.token = auth[0], auth[1]
+
+    def _acquire(self):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self.get_connection()
+        self._authenticate(connection)
+        return connection
+
+    def _release(self, connection):
+        auth = self._auth
+        if connection.token and (auth is None or
+                                 connection.token != auth[1]):
+            # the Swift client authenticated again after a 401
+            self._auth = (connection.url, connection.token,
+                          time.time() + self.token_ttl)
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    @contextlib.contextmanager
+    def _connection(self):
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    @instrumentation.timed('swift')
     def delete(self, filename):
         try:
-            self.connection.delete_object(self.container, filename)
+            with self._connection() as connection:
+                connection.delete_object(self.container, filename)
         except swiftclient.exceptions.ClientException:
             raise exceptions.StoreExceptions('An error occured while '
                                              'deleting %s' % filename)
 
+    @instrumentation.timed('swift')
     def get(self, filename):
-        return self.connection.get_object(self.container, filename,
-                                          resp_chunk_size=65535)
+        connection = self._acquire()
+        try:
+            headers, body = connection.get_object(self.container, filename,
+                                                  resp_chunk_size=65535)
+        except Exception:
+            self._release(connection)
+            raise
+        return headers, _PooledBody(body,
+                                    lambda: self._release(connection))
 
+    @instrumentation.timed('swift')
     def head(self, filename):
         try:
-            return self.connection.head_object(self.container, filename)
+            with self._connection() as connection:
+                return connection.head_object(self.container, filename)
         except swiftclient.exceptions.ClientException:
             raise exceptions.DCINotFound('Content File', filename)
 
-    def upload(self, file_path, iterable, pseudo_folder=None,
-               create_container=True):
+    def _ensure_container(self, connection, create_container):
         try:
-            self.connection.head_container(self.container)
+            connection.head_container(self.container)
         except swiftclient.exceptions.ClientException as exc:
             if exc.http_reason == 'Not Found' and create_container:
-                self.connection.put_container(self.container)
+                connection.put_container(self.container)
+            else:
+                return
+        self._containers.add(self.container)
 
-        self.connection.put_object(self.container, file_path, iterable)
+    @instrumentation.timed('swift')
+    def upload(self, file_path, iterable, pseudo_folder=None,
+               create_container=True):
+        with self._connection() as connection:
+            if self.container not in self._containers:
+                self._ensure_container(connection, create_container)
+            try:
+                connection.put_object(self.container, file_path, iterable)
+            except swiftclient.exceptions.ClientException:
+                # the container may have been removed, check it again on
+                # the next upload
+                self._containers.discard(self.container)
+                raise
 
     def build_file_path(self, root, middle, file_id):
         root = str(root)
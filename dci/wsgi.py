@@ -22,3 +22,4 @@ import dci.dci_config
 
 conf = dci.dci_config.generate_conf()
 application = dci.app.create_app(conf)
+dci.app.install_reload_handler(application)
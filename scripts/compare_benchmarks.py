@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# Compare two result files written by the benchmark suite (tox -e benchmark)
+#
+#   ./scripts/compare_benchmarks.py before.json after.json
+
+from __future__ import print_function
+
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(before_path, after_path):
+    before = load(before_path)
+    after = load(after_path)
+    for run in (before, after):
+        print('%(date)s size=%(size)s rounds=%(rounds)s' % run['_meta'])
+
+    row = '%-40s %12s %12s %8s'
+    print(row % ('benchmark (median ms)', 'before', 'after', 'ratio'))
+    for name in sorted(set(before['benchmarks']) | set(after['benchmarks'])):
+        old = before['benchmarks'].get(name, {}).get('median')
+        new = after['benchmarks'].get(name, {}).get('median')
+        ratio = '%.2fx' % (new / old) if old and new else '-'
+        print(row % (name,
+                     '%.2f' % old if old is not None else '-',
+                     '%.2f' % new if new is not None else '-',
+                     ratio))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: %s before.json after.json' % sys.argv[0])
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2])
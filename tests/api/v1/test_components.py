@@ -331,6 +331,34 @@ def test_export_control_filter(admin, user, team_user_id, topic_user_id):
     assert len(req.data['components']) == 3
 
 
+def test_export_control_filter_with_cursor(admin, user, team_user_id,
+                                           topic_user_id):
+    exported = []
+    for i, export_control in enumerate((True, False, False, True)):
+        data = {'name': 'pname%s' % i,
+                'type': 'gerrit_review',
+                'topic_id': topic_user_id,
+                'export_control': export_control}
+        component = admin.post('/api/v1/components',
+                               data=data).data['component']
+        if export_control:
+            exported.append(component['id'])
+
+    # the first page only has one exported component, the second one
+    # holds the other one
+    url = ('/api/v1/topics/%s/components?sort=created_at&limit=2' %
+           topic_user_id)
+    components = user.get(url).data
+    ids = [c['id'] for c in components['components']]
+    assert ids == exported[:1]
+    assert components['_meta']['next'] is not None
+
+    components = user.get('%s&cursor=%s' % (
+        url, components['_meta']['next'])).data
+    ids.extend(c['id'] for c in components['components'])
+    assert ids == exported
+
+
 def test_add_file_to_component(admin, topic_id):
     with mock.patch(SWIFT, spec=Swift) as mock_swift:
 
@@ -20,6 +20,7 @@ import pytest
 import six
 import uuid
 
+from dci.api.v1 import utils as v1_utils
 from dci.stores.swift import Swift
 from dci.common import utils
 from tests.data import JUNIT
@@ -119,6 +120,90 @@ def test_get_all_jobs_with_pagination(admin, remoteci_user_id,
     assert jobs.data['jobs'] == []
 
 
+def test_get_all_jobs_with_cursor(admin, remoteci_user_id,
+                                  components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    jobs_ids = [admin.post('/api/v1/jobs', data=data).data['job']['id']
+                for _ in range(5)]
+
+    for sort in ('created_at', '-created_at', 'status,-created_at'):
+        expected = [job['id'] for job in
+                    admin.get('/api/v1/jobs?sort=%s' % sort).data['jobs']]
+        ids = []
+        url = '/api/v1/jobs?sort=%s&limit=2&embed=components' % sort
+        jobs = admin.get(url).data
+        while True:
+            assert jobs['_meta']['count'] == 5
+            ids.extend(job['id'] for job in jobs['jobs'])
+            if jobs['_meta']['next'] is None:
+                break
+            jobs = admin.get('%s&cursor=%s' % (url,
+                                               jobs['_meta']['next'])).data
+        assert ids == expected
+        assert sorted(ids) == sorted(jobs_ids)
+
+    jobs = admin.get('/api/v1/jobs?limit=2&cursor=foo')
+    assert jobs.status_code == 400
+    # the values of the cursor do not have the types of the sort keys
+    jobs = admin.get('/api/v1/jobs?limit=2&cursor=%s' %
+                     v1_utils.encode_cursor([1, 'x']))
+    assert jobs.status_code == 400
+
+
+def test_get_all_jobs_count(admin, remoteci_user_id, components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    for _ in range(3):
+        admin.post('/api/v1/jobs', data=data)
+
+    for args in ('', 'limit=2', 'limit=2&offset=1', 'embed=components',
+                 'limit=2&embed=components', 'offset=5'):
+        jobs = admin.get('/api/v1/jobs?count=exact&%s' % args).data
+        assert jobs['_meta']['count'] == 3
+        assert all('_count' not in job for job in jobs['jobs'])
+
+    jobs = admin.get('/api/v1/jobs?count=estimate&limit=2').data
+    assert isinstance(jobs['_meta']['count'], int)
+    assert len(jobs['jobs']) == 2
+
+    jobs = admin.get('/api/v1/jobs?count=none&limit=2').data
+    assert jobs['_meta']['count'] is None
+    assert len(jobs['jobs']) == 2
+
+    jobs = admin.get('/api/v1/jobs?count=all')
+    assert jobs.status_code == 400
+
+
+def test_get_all_jobs_with_fields(app, admin, remoteci_user_id,
+                                  components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    job_id = admin.post('/api/v1/jobs', data=data).data['job']['id']
+    admin.post('/api/v1/jobs', data=data)
+
+    url = ('/api/v1/jobs?embed=remoteci,components&sort=-created_at'
+           '&fields=status,remoteci.name,components.name')
+    for aggregation, args in ((False, ''), (False, '&limit=1'),
+                              (True, '&limit=1')):
+        app.config['EMBED_JSON_AGGREGATION'] = aggregation
+        jobs = admin.get(url + args).data['jobs']
+        assert set(jobs[0].keys()) == set(['id', 'status', 'created_at',
+                                           'remoteci', 'components'])
+        assert set(jobs[0]['remoteci'].keys()) == set(['id', 'name'])
+        for component in jobs[0]['components']:
+            assert set(component.keys()) == set(['id', 'name'])
+
+    job = admin.get('/api/v1/jobs/%s?embed=remoteci&fields=remoteci.name' %
+                    job_id).data['job']
+    assert job['comment'] is None
+    assert set(job['remoteci'].keys()) == set(['id', 'name'])
+
+    for fields in ('foo', 'team.name', 'remoteci.foo'):
+        jobs = admin.get('/api/v1/jobs?embed=remoteci&fields=%s' % fields)
+        assert jobs.status_code == 400
+
+
 def test_get_all_jobs_with_embed(admin, team_user_id, remoteci_user_id,
                                  components_user_ids):
     # create 2 jobs and check meta data count
@@ -228,6 +313,44 @@ def test_get_all_jobs_with_duplicated_embed(admin, team_user_id,
     assert jobs['jobs'][0]['remoteci']['tests'][0]['id'] == test_rci_id
 
 
+def test_get_all_jobs_with_aggregated_embeds(app, admin, team_user_id,
+                                             remoteci_user_id,
+                                             components_user_ids,
+                                             topic_user_id):
+    test_id = admin.post('/api/v1/tests',
+                         data={'name': 'test_topic',
+                               'team_id': team_user_id}).data['test']['id']
+    admin.post('/api/v1/topics/%s/tests' % topic_user_id,
+               data={'test_id': test_id})
+    data = {'topic_id': topic_user_id,
+            'team_id': team_user_id,
+            'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    admin.post('/api/v1/jobs', data=data)
+    admin.post('/api/v1/jobs', data=data)
+
+    def get_jobs():
+        jobs = admin.get('/api/v1/jobs?embed=metas,topic,topic.tests,'
+                         'components,files,team,remoteci,remoteci.tests'
+                         '&limit=10').data['jobs']
+        return [(job['id'],
+                 sorted(c['id'] for c in job['components']),
+                 [t['id'] for t in job['topic']['tests']],
+                 job['remoteci']['tests'],
+                 job['metas'],
+                 job['files'],
+                 job['team']['id']) for job in jobs]
+
+    joined = get_jobs()
+    app.config['EMBED_JSON_AGGREGATION'] = True
+    aggregated = get_jobs()
+
+    assert len(aggregated) == 2
+    assert aggregated == joined
+    assert aggregated[0][1] == sorted(components_user_ids)
+    assert aggregated[0][2] == [test_id]
+
+
 def test_get_all_jobs_with_embed_and_limit(admin, remoteci_user_id,
                                            components_user_ids):
     # create 2 jobs and check meta data count
@@ -244,6 +367,71 @@ def test_get_all_jobs_with_embed_and_limit(admin, remoteci_user_id,
     assert len(jobs['jobs'][0]['components']) == 3
 
 
+def test_get_all_jobs_streamed(app, admin, remoteci_user_id,
+                               components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    job_ids = [admin.post('/api/v1/jobs', data=data).data['job']['id']
+               for _ in range(3)]
+
+    def get_jobs():
+        jobs = admin.get('/api/v1/jobs?embed=components,remoteci'
+                         '&sort=created_at').data
+        return ([(job['id'],
+                  sorted(c['id'] for c in job['components']),
+                  job['remoteci']['id']) for job in jobs['jobs']],
+                jobs['_meta'])
+
+    app.config['STREAM_BATCH_SIZE'] = 0
+    buffered = get_jobs()
+    # the 3 rows of a job are read over several batches
+    app.config['STREAM_BATCH_SIZE'] = 2
+    streamed = get_jobs()
+
+    assert streamed == buffered
+    assert [job[0] for job in streamed[0]] == job_ids
+    assert streamed[0][0][1] == sorted(components_user_ids)
+    assert streamed[1]['count'] == 3
+
+    app.config['STREAM_BATCH_SIZE'] = 1
+    jobs = admin.get('/api/v1/jobs?offset=1&sort=created_at').data
+    assert [job['id'] for job in jobs['jobs']] == job_ids[1:]
+    assert jobs['_meta']['count'] == 3
+
+
+def test_get_all_jobs_streamed_records_the_db_timings(app, admin,
+                                                      remoteci_user_id,
+                                                      components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    for _ in range(3):
+        admin.post('/api/v1/jobs', data=data)
+    app.config['STREAM_BATCH_SIZE'] = 1
+
+    with mock.patch('dci.common.instrumentation.monitoring.'
+                    'observe_backend') as m_observe:
+        jobs = admin.get('/api/v1/jobs')
+        assert len(jobs.data['jobs']) == 3
+    # one read per job, then the empty read ending the cursor
+    fetches = [c for c in m_observe.call_args_list if c[0][0] == 'db']
+    assert len(fetches) >= 3 + 1
+
+
+def test_get_all_jobs_sorted_by_embed_many_is_not_streamed(
+        app, admin, remoteci_user_id, components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    job_ids = [admin.post('/api/v1/jobs', data=data).data['job']['id']
+               for _ in range(2)]
+    app.config['STREAM_BATCH_SIZE'] = 1
+
+    jobs = admin.get('/api/v1/jobs?embed=components'
+                     '&sort=components.name').data
+    assert sorted(job['id'] for job in jobs['jobs']) == sorted(job_ids)
+    assert all(len(job['components']) == 3 for job in jobs['jobs'])
+    assert jobs['_meta']['count'] == 2
+
+
 def test_get_all_jobs_with_embed_not_valid(admin):
     jds = admin.get('/api/v1/jobs?embed=mdr')
     assert jds.status_code == 400
@@ -334,6 +522,64 @@ def test_get_all_jobs_with_where(admin, team_user_id, job_user_id):
     assert db_job_id == job_user_id
 
 
+def test_get_all_jobs_with_where_operators(admin, remoteci_user_id,
+                                           components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    job_1 = admin.post('/api/v1/jobs', data=data).data['job']
+    job_2 = admin.post('/api/v1/jobs',
+                       data=dict(data, comment='foo_1')).data['job']
+    admin.put('/api/v1/jobs/%s' % job_2['id'], data={'status': 'failure'},
+              headers={'If-match': job_2['etag']})
+
+    def get_job_ids(where):
+        jobs = admin.get('/api/v1/jobs?where=%s&sort=created_at' % where)
+        assert jobs.status_code == 200
+        return [job['id'] for job in jobs.data['jobs']]
+
+    assert get_job_ids('created_at>%s' % job_1['created_at']) == [
+        job_2['id']]
+    assert get_job_ids('created_at<=%s' % job_1['created_at']) == [
+        job_1['id']]
+    assert get_job_ids('status:new|failure') == [job_1['id'], job_2['id']]
+    assert get_job_ids('status!:new') == [job_2['id']]
+    assert get_job_ids('comment:null') == [job_1['id']]
+    assert get_job_ids('comment!:null') == [job_2['id']]
+    assert get_job_ids('comment:foo_*') == [job_2['id']]
+    assert get_job_ids('comment:fo%25*') == []
+    assert get_job_ids('id:%s|%s' % (job_1['id'], job_2['id'])) == [
+        job_1['id'], job_2['id']]
+
+    for where in ('status:foo', 'created_at>yesterday', 'id:1|2'):
+        assert admin.get('/api/v1/jobs?where=%s' % where).status_code == 400
+
+
+def test_get_all_jobs_with_where_escaped_values(admin, remoteci_user_id,
+                                                components_user_ids):
+    data = {'remoteci_id': remoteci_user_id,
+            'components': components_user_ids}
+    job_ids = {}
+    for comment in ('a|b', 'a*', 'ab', 'null', 'a\\b'):
+        job = admin.post('/api/v1/jobs',
+                         data=dict(data, comment=comment)).data['job']
+        job_ids[comment] = job['id']
+
+    def get_job_ids(where):
+        jobs = admin.get('/api/v1/jobs?where=%s&sort=created_at' % where)
+        assert jobs.status_code == 200
+        return [job['id'] for job in jobs.data['jobs']]
+
+    assert get_job_ids('comment:a%5C|b') == [job_ids['a|b']]
+    assert get_job_ids('comment:a%5C*') == [job_ids['a*']]
+    assert get_job_ids('comment:a*') == [job_ids['a|b'], job_ids['a*'],
+                                         job_ids['ab'], job_ids['a\\b']]
+    assert get_job_ids('comment:%5Cnull') == [job_ids['null']]
+    assert get_job_ids('comment:a%5C%5Cb') == [job_ids['a\\b']]
+    assert get_job_ids('comment:ab|a%5C|b') == [job_ids['a|b'],
+                                                job_ids['ab']]
+    assert get_job_ids('comment!:%5Cnull|a*|ab|a%5C|b|a%5C%5Cb') == []
+
+
 def test_where_invalid(admin):
     err = admin.get('/api/v1/jobs?where=id')
 
@@ -55,3 +55,18 @@ def test_metrics_admin(admin, remoteci_id, team_id, product):
 def test_metrics_user(user):
     res = user.get('/api/v1/metrics/topics')
     assert res.status_code == 401
+
+
+def test_runtime_metrics_admin(admin):
+    admin.get('/api/v1/jobs')
+    res = admin.get('/api/v1/_metrics')
+    assert res.status_code == 200
+    assert 'dci_requests_total{' in res.data
+    assert 'endpoint="/api/v1/jobs"' in res.data
+    assert 'dci_backend_duration_seconds_count{backend="db"}' in res.data
+    assert 'dci_db_pool_checked_out' in res.data
+
+
+def test_runtime_metrics_not_super_admin(user, product_owner):
+    assert user.get('/api/v1/_metrics').status_code == 401
+    assert product_owner.get('/api/v1/_metrics').status_code == 401
@@ -146,6 +146,50 @@ def test_get_all_topics_with_pagination(admin, product):
     assert cs.data['topics'] == []
 
 
+def test_get_topics_not_modified(admin, topic_id):
+    topic = admin.get('/api/v1/topics/%s' % topic_id)
+    etag = topic.headers['ETag']
+    topic = admin.get('/api/v1/topics/%s' % topic_id,
+                      headers={'If-None-Match': etag})
+    assert topic.status_code == 304
+    assert topic.headers['ETag'] == etag
+
+    topics = admin.get('/api/v1/topics', headers={'If-None-Match': ''})
+    topics_etag = topics.headers['ETag']
+    assert topics.status_code == 200
+    assert topics.data['_meta']['count'] == 1
+    topics = admin.get('/api/v1/topics',
+                       headers={'If-None-Match': topics_etag})
+    assert topics.status_code == 304
+    assert topics.headers['ETag'] == topics_etag
+
+    topic_update(admin, topic_id)
+
+    topic = admin.get('/api/v1/topics/%s' % topic_id,
+                      headers={'If-None-Match': etag})
+    assert topic.status_code == 200
+    topics = admin.get('/api/v1/topics',
+                       headers={'If-None-Match': topics_etag})
+    assert topics.status_code == 200
+    assert topics.headers['ETag'] != topics_etag
+
+    # the embeds may change without the topics
+    topics = admin.get('/api/v1/topics?embed=product',
+                       headers={'If-None-Match': '*'})
+    assert topics.status_code == 200
+
+    # without exact count, the validator is only computed on demand
+    topics = admin.get('/api/v1/topics?count=none',
+                       headers={'If-None-Match': ''})
+    assert topics.status_code == 200
+    assert 'ETag' not in topics.headers
+    topics_etag = admin.get('/api/v1/topics?count=none',
+                            headers={'If-None-Match': '"foo"'}).headers['ETag']
+    topics = admin.get('/api/v1/topics?count=none',
+                       headers={'If-None-Match': topics_etag})
+    assert topics.status_code == 304
+
+
 def test_get_all_topics_with_where(admin, product):
     # create 20 topic types and check meta data count
     topics = {}
@@ -447,6 +491,22 @@ def test_delete_team_from_topic_as_user(admin, user, product):
     assert status_code == 401
 
 
+def test_topic_access_follows_team_membership(admin, user, team_user_id,
+                                              product):
+    data = {'name': 'tname', 'product_id': product['id'],
+            'component_types': ['type1', 'type2']}
+    pt_id = admin.post('/api/v1/topics', data=data).data['topic']['id']
+
+    assert user.get('/api/v1/topics/%s' % pt_id).status_code == 412
+
+    admin.post('/api/v1/topics/%s/teams' % pt_id,
+               data={'team_id': team_user_id})
+    assert user.get('/api/v1/topics/%s' % pt_id).status_code == 200
+
+    admin.delete('/api/v1/topics/%s/teams/%s' % (pt_id, team_user_id))
+    assert user.get('/api/v1/topics/%s' % pt_id).status_code == 412
+
+
 def test_status_from_component_type_last_component(admin, topic_id,
                                                    components_ids,
                                                    remoteci_id,
@@ -15,10 +15,21 @@
 # under the License.
 
 from dci import auth
+from dci import auth_mechanism
 from dci import dci_config
+from dci.db import models
 
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+import flask
+from jwt import exceptions as jwt_exc
 import mock
 import datetime
+import pytest
+import sqlalchemy
+import time
+import uuid
 
 
 def test_api_with_unauthorized_credentials(unauthorized, topic_id):
@@ -55,3 +66,149 @@ def test_decode_jwt(m_datetime, access_token):
     decoded_jwt = auth.decode_jwt(access_token, pubkey, 'dci-cs')
     assert decoded_jwt['username'] == 'dci'
     assert decoded_jwt['email'] == 'dci@distributed-ci.io'
+
+
+def _other_public_key():
+    private_key = rsa.generate_private_key(public_exponent=65537,
+                                           key_size=2048,
+                                           backend=default_backend())
+    return private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
+@mock.patch('jwt.api_jwt.datetime', spec=datetime.datetime)
+def test_decode_jwt_with_rotated_keys(m_datetime, access_token):
+    pubkey = dci_config.generate_conf()['SSO_PUBLIC_KEY']
+    m_utcnow = mock.MagicMock()
+    m_utcnow.utctimetuple.return_value = datetime.datetime.\
+        fromtimestamp(1505564918).timetuple()
+    m_datetime.utcnow.return_value = m_utcnow
+
+    decoded_jwt = auth.decode_jwt(access_token,
+                                  [_other_public_key(), pubkey], 'dci-cs')
+    assert decoded_jwt['username'] == 'dci'
+    with pytest.raises(jwt_exc.DecodeError):
+        auth.decode_jwt(access_token, [_other_public_key()], 'dci-cs')
+
+
+def test_verified_tokens_are_remembered_until_expiration():
+    verified_tokens = auth.VerifiedTokens(max_ttl=300)
+    claims = {'username': 'dci', 'exp': time.time() + 60}
+
+    with mock.patch('dci.auth.decode_jwt', return_value=claims) as decode:
+        assert verified_tokens.decode('token', 'key', 'dci') == claims
+        assert verified_tokens.decode('token', 'key', 'dci') == claims
+        assert decode.call_count == 1
+
+        claims['exp'] = time.time() - 1
+        assert verified_tokens.decode('expired', 'key', 'dci') == claims
+        verified_tokens.decode('expired', 'key', 'dci')
+        assert decode.call_count == 3
+
+
+def test_verified_passwords_are_remembered():
+    verified_passwords = auth.VerifiedPasswords(ttl=60)
+    encrypted_password = auth.hash_password('password')
+
+    with mock.patch('dci.auth.check_passwords_equal',
+                    wraps=auth.check_passwords_equal) as check:
+        assert verified_passwords.check('id', 'password', encrypted_password)
+        assert verified_passwords.check('id', 'password', encrypted_password)
+        assert check.call_count == 1
+
+        assert not verified_passwords.check('id', 'wrong',
+                                            encrypted_password)
+        assert not verified_passwords.check('id', 'wrong',
+                                            encrypted_password)
+        assert check.call_count == 3
+
+        verified_passwords.clear()
+        assert verified_passwords.check('id', 'password', encrypted_password)
+        assert check.call_count == 4
+
+
+def test_verified_passwords_ignore_previous_hash():
+    verified_passwords = auth.VerifiedPasswords(ttl=60)
+    old_password = auth.hash_password('old')
+    new_password = auth.hash_password('new')
+
+    assert verified_passwords.check('id', 'old', old_password)
+    assert not verified_passwords.check('id', 'old', new_password)
+
+
+def test_role_table_is_loaded_once(app, engine):
+    with app.app_context():
+        flask.g.db_conn = engine.connect()
+        user_role_id = auth.get_role_id('USER')
+
+        with mock.patch('dci.auth.RoleTable.load') as load:
+            assert auth.get_role_id('USER') == user_role_id
+            assert not load.called
+
+        flask.g.db_conn.execute(models.ROLES.update().where(
+            models.ROLES.c.id == user_role_id).values(description='user'))
+        with mock.patch('dci.auth.RoleTable.load',
+                        wraps=auth.RoleTable.load) as load:
+            assert auth.get_role_id('USER') == user_role_id
+            assert load.call_count == 1
+        flask.g.db_conn.close()
+
+
+def test_role_table_is_loaded_again_after_ttl():
+    roles = auth.Roles(ttl=30)
+    with mock.patch('dci.auth.RoleTable.load') as load:
+        with mock.patch('time.time', return_value=1000):
+            first = roles.get(None)
+            assert roles.get(None) is first
+        assert load.call_count == 1
+
+        with mock.patch('time.time', return_value=1031):
+            roles.get(None)
+        assert load.call_count == 2
+
+
+def test_identity_and_its_teams_are_loaded_in_one_statement(app, engine,
+                                                            admin):
+    team_ids = {}
+    for name, parent in (('a', None), ('b', 'a'), ('c', 'b'), ('d', None)):
+        data = {'name': 'tree_%s' % name}
+        if parent is not None:
+            data['parent_id'] = team_ids[parent]
+        team = admin.post('/api/v1/teams', data=data).data['team']
+        team_ids[name] = team['id']
+    user = admin.post('/api/v1/users',
+                      data={'name': 'lookup@example.org', 'password': 'pass',
+                            'fullname': 'Lookup', 'email': 'lu@example.org',
+                            'team_id': team_ids['a']}).data['user']
+    # an inactive user whose email is the name of the first one
+    admin.post('/api/v1/users',
+               data={'name': 'other', 'password': 'pass',
+                     'fullname': 'Other', 'email': 'lookup@example.org',
+                     'team_id': team_ids['d'], 'state': 'inactive'})
+
+    executed = []
+
+    def record_statement(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    with app.app_context():
+        flask.g.db_conn = engine.connect()
+        auth.get_role_table()
+        sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                                record_statement)
+        try:
+            identity = auth_mechanism.BaseMechanism(None)._identity_from_db(
+                models.USERS, ('name', 'email'), 'lookup@example.org')
+        finally:
+            sqlalchemy.event.remove(engine, 'before_cursor_execute',
+                                    record_statement)
+            flask.g.db_conn.close()
+
+    assert len(executed) == 1
+    assert str(identity.id) == user['id']
+    assert str(identity.team['id']) == team_ids['a']
+    assert sorted(str(team['id']) for team in identity.partner_teams) == \
+        sorted([team_ids['b'], team_ids['c']])
+    assert sorted(identity.teams) == sorted(
+        uuid.UUID(team_ids[name]) for name in ('a', 'b', 'c'))
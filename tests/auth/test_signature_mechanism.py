@@ -18,8 +18,11 @@ import datetime
 
 import dci.auth_mechanism as authm
 from dci.common import exceptions as dci_exc
+from dci.common import signature
 
+import mock
 import pytest
+import six
 import uuid
 
 
@@ -138,3 +141,53 @@ def test_sam_authenticate():
     mech.verify_auth_signature = return_is_authenticated
     mech.get_identity = return_get_identity
     mech.authenticate()
+
+
+class MockStreamedRequest(MockSignedRequest):
+    method = 'POST'
+    path = '/api/v1/files'
+    query_string = b''
+
+    def __init__(self, headers, payload):
+        super(MockStreamedRequest, self).__init__(headers)
+        self.stream = six.BytesIO(payload)
+
+    @property
+    def data(self):
+        raise AssertionError('the payload must not be loaded in memory')
+
+
+def _streamed_mechanism(payload, signed_payload):
+    timestamp = datetime.datetime.utcnow()
+    their_signature = signature.gen_signature(
+        b'dummy', b'POST', b'text/plain', timestamp, b'/api/v1/files', b'',
+        signed_payload)
+    headers = {
+        'DCI-Client-Info': '%s/remoteci/Morbo' % timestamp.strftime(
+            '%Y-%m-%d %H:%M:%SZ'),
+        'DCI-Auth-Signature': their_signature,
+        'Content-Type': 'text/plain',
+    }
+    mech = authm.SignatureAuthMechanism(
+        MockStreamedRequest(headers, payload), streamed_payload=True)
+    mech.get_identity = return_get_identity
+    return mech
+
+
+def test_sam_streamed_payload_valid_signature():
+    mech = _streamed_mechanism(b'content', b'content')
+    assert mech.authenticate()
+
+    assert mech.deferred_signature.stream.read() == b'content'
+    mech.deferred_signature.verify()
+
+
+def test_sam_streamed_payload_invalid_signature():
+    rollback = mock.Mock()
+    mech = _streamed_mechanism(b'content', b'other content')
+    assert mech.authenticate()
+
+    assert mech.deferred_signature.stream.read(3) == b'con'
+    with pytest.raises(dci_exc.DCIException):
+        mech.deferred_signature.verify(rollback)
+    assert rollback.called
@@ -0,0 +1,25 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+
+# The benchmarks only run when DCI_BENCHMARK_OUTPUT names the JSON file
+# where their results are written.
+OUTPUT = os.environ.get('DCI_BENCHMARK_OUTPUT')
+# Number of jobs created before each benchmark
+SIZE = int(os.environ.get('DCI_BENCHMARK_SIZE', 10))
+# Number of times each request is repeated
+ROUNDS = int(os.environ.get('DCI_BENCHMARK_ROUNDS', 5))
@@ -0,0 +1,136 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+import json
+import os
+import platform
+import time
+
+import mock
+import pytest
+import six
+
+from dci.common import utils as dci_utils
+from dci.stores.swift import Swift
+from tests.benchmarks import OUTPUT, ROUNDS, SIZE
+from tests.conftest import SWIFT
+
+_JUNIT_FILE = os.path.join(os.path.dirname(__file__), os.pardir, 'data',
+                           'tempest-results.xml')
+
+
+def _summary(durations):
+    durations = sorted(durations)
+    return {
+        'rounds': len(durations),
+        'min': durations[0],
+        'max': durations[-1],
+        'mean': sum(durations) / len(durations),
+        'median': durations[len(durations) // 2],
+    }
+
+
+@pytest.fixture(scope='session')
+def benchmark_results(request):
+    results = {}
+
+    def write_results():
+        if not OUTPUT or not results:
+            return
+        with open(OUTPUT, 'w') as f:
+            json.dump({
+                '_meta': {
+                    'date': datetime.datetime.utcnow().isoformat(),
+                    'size': SIZE,
+                    'rounds': ROUNDS,
+                    'python': platform.python_version(),
+                },
+                'benchmarks': results,
+            }, f, indent=2, sort_keys=True)
+
+    request.addfinalizer(write_results)
+    return results
+
+
+@pytest.fixture
+def benchmark(benchmark_results):
+    """Call a function ROUNDS times and record its durations, in
+    milliseconds, under the given name."""
+
+    def run(name, func, *args, **kwargs):
+        durations = []
+        for _ in range(ROUNDS):
+            start = time.time()
+            result = func(*args, **kwargs)
+            durations.append((time.time() - start) * 1000)
+        benchmark_results[name] = _summary(durations)
+        return result
+
+    return run
+
+
+@pytest.fixture
+def junit():
+    with open(_JUNIT_FILE, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def swift(request, junit):
+    patcher = mock.patch(SWIFT, spec=Swift)
+    mock_swift = patcher.start()
+    request.addfinalizer(patcher.stop)
+
+    mockito = mock.MagicMock()
+    mockito.head.return_value = {
+        'etag': dci_utils.gen_etag(),
+        'content-type': 'stream',
+        'content-length': len(junit)
+    }
+    mockito.get.side_effect = lambda path: (True, six.BytesIO(junit))
+    mock_swift.return_value = mockito
+    return mockito
+
+
+@pytest.fixture
+def dataset(admin, user, remoteci_context, remoteci_user_id, topic_user_id,
+            components_user_ids, swift, junit):
+    """Create SIZE jobs, each with two jobstates, a junit file and a text
+    file."""
+
+    jobs = []
+    for _ in range(SIZE):
+        job = remoteci_context.post('/api/v1/jobs/schedule',
+                                    data={'remoteci_id': remoteci_user_id,
+                                          'topic_id': topic_user_id}).data
+        job_id = job['job']['id']
+        jobs.append(job_id)
+        for status in ('running', 'success'):
+            user.post('/api/v1/jobstates',
+                      headers={'Content-Type': 'application/json'},
+                      data={'job_id': job_id, 'status': status,
+                            'comment': 'benchmark'})
+        for name, mime, content in (('results.xml', 'application/junit',
+                                     junit),
+                                    ('console.log', 'text/plain',
+                                     b'benchmark')):
+            user.post('/api/v1/files',
+                      headers={'DCI-JOB-ID': job_id, 'DCI-NAME': name,
+                               'DCI-MIME': mime,
+                               'Content-Type': 'text/plain'},
+                      data=content)
+    return jobs
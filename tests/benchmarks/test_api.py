@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import pytest
+
+from dci.api.v1 import jobs
+from tests.benchmarks import OUTPUT
+
+pytestmark = pytest.mark.skipif(
+    not OUTPUT, reason='DCI_BENCHMARK_OUTPUT is not set')
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+@pytest.mark.parametrize('embed', sorted(jobs._EMBED_MANY))
+def test_get_jobs_with_embed(benchmark, admin, dataset, embed):
+    res = benchmark('GET /jobs?embed=%s' % embed,
+                    admin.get, '/api/v1/jobs?embed=%s' % embed)
+    assert res.status_code == 200
+    assert res.data['_meta']['count'] == len(dataset)
+
+
+def test_get_jobs_with_all_embeds(benchmark, admin, dataset):
+    embed = ','.join(sorted(jobs._EMBED_MANY))
+    res = benchmark('GET /jobs?embed=all',
+                    admin.get, '/api/v1/jobs?embed=%s' % embed)
+    assert res.status_code == 200
+
+
+def test_schedule_job(benchmark, remoteci_context, remoteci_user_id,
+                      topic_user_id, dataset):
+    res = benchmark('POST /jobs/schedule',
+                    remoteci_context.post, '/api/v1/jobs/schedule',
+                    data={'remoteci_id': remoteci_user_id,
+                          'topic_id': topic_user_id})
+    assert res.status_code == 201
+
+
+def test_create_jobstate(benchmark, user, dataset):
+    res = benchmark('POST /jobstates',
+                    user.post, '/api/v1/jobstates', headers=JSON_HEADERS,
+                    data={'job_id': dataset[0], 'status': 'running',
+                          'comment': 'benchmark'})
+    assert res.status_code == 201
+
+
+def test_create_junit_file(benchmark, user, dataset, junit):
+    headers = {'DCI-JOB-ID': dataset[0], 'DCI-NAME': 'tempest.xml',
+               'DCI-MIME': 'application/junit',
+               'Content-Type': 'text/plain'}
+    res = benchmark('POST /files (junit)',
+                    user.post, '/api/v1/files', headers=headers, data=junit)
+    assert res.status_code == 201
+
+
+def test_get_job_results(benchmark, user, dataset):
+    res = benchmark('GET /jobs/<id>/results',
+                    user.get, '/api/v1/jobs/%s/results' % dataset[0],
+                    headers=JSON_HEADERS)
+    assert res.status_code == 200
+    assert res.data['_meta']['count'] == 1
+
+
+def test_get_topics_metrics(benchmark, admin, dataset):
+    res = benchmark('GET /metrics/topics',
+                    admin.get, '/api/v1/metrics/topics')
+    assert res.status_code == 200
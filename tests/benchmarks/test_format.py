@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import uuid
+
+import pytest
+
+from dci.api.v1 import utils as v1_utils
+from tests.benchmarks import OUTPUT, SIZE
+
+
+class Row(tuple):
+    """Stand-in for a RowProxy: a tuple of values with their labels."""
+
+    def __new__(cls, items):
+        row = super(Row, cls).__new__(cls, [value for _, value in items])
+        row._keys = [key for key, _ in items]
+        return row
+
+    def keys(self):
+        return self._keys
+
+
+def _legacy_format_level_1(rows, root_table_name):
+    result_rows = []
+    for row in rows:
+        row = dict(zip(row.keys(), row))
+        result_row = {}
+        prefixes_to_remove = []
+        for field in row:
+            prefix, suffix = field.split('_', 1)
+            if suffix == 'id' and row[field] is None:
+                prefixes_to_remove.append(prefix)
+            if prefix not in result_row:
+                result_row[prefix] = {suffix: row[field]}
+            else:
+                result_row[prefix].update({suffix: row[field]})
+        for prefix_to_remove in prefixes_to_remove:
+            result_row.pop(prefix_to_remove)
+        root_table_fields = result_row.pop(root_table_name)
+        result_row.update(root_table_fields)
+        result_rows.append(result_row)
+    return result_rows
+
+
+def _rows(count):
+    rows = []
+    for i in range(count):
+        items = []
+        for table in ('jobs', 'remoteci', 'team', 'topic', 'rconfiguration'):
+            if table == 'rconfiguration' and i % 2:
+                items.append(('%s_id' % table, None))
+            else:
+                items.append(('%s_id' % table, str(uuid.uuid4())))
+            for column in ('name', 'state', 'created_at', 'updated_at',
+                           'etag', 'data', 'team_id'):
+                items.append(('%s_%s' % (table, column),
+                              '%s-%s' % (column, i)))
+        rows.append(Row(items))
+    return rows
+
+
+def test_format_level_1_keeps_the_output():
+    rows = _rows(10)
+
+    expected = _legacy_format_level_1(rows, 'jobs')
+    result = v1_utils._format_level_1(rows, 'jobs')
+
+    assert json.dumps(result, sort_keys=True) == \
+        json.dumps(expected, sort_keys=True)
+
+
+@pytest.mark.skipif(not OUTPUT, reason='DCI_BENCHMARK_OUTPUT is not set')
+def test_format_level_1(benchmark):
+    rows = _rows(SIZE * 100)
+
+    benchmark('format level 1 (legacy)', _legacy_format_level_1, rows, 'jobs')
+    benchmark('format level 1', v1_utils._format_level_1, rows, 'jobs')
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci.common import cache
+from dci.db import models
+
+import mock
+
+
+def test_ttl_cache_expiration():
+    ttl_cache = cache.TTLCache(ttl=10)
+    with mock.patch('time.time', return_value=100):
+        ttl_cache.set('key', 'value')
+        assert ttl_cache.get('key') == 'value'
+    with mock.patch('time.time', return_value=110):
+        assert ttl_cache.get('key') is None
+
+
+def test_ttl_cache_disabled():
+    ttl_cache = cache.TTLCache(ttl=0)
+    ttl_cache.set('key', 'value')
+    assert ttl_cache.get('key') is None
+
+
+def test_get_or_load_drops_values_loaded_during_a_clear():
+    ttl_cache = cache.TTLCache(ttl=10)
+
+    def loader():
+        ttl_cache.clear()
+        return 'stale'
+
+    assert ttl_cache.get_or_load('key', loader) == 'stale'
+    assert ttl_cache.get('key') is None
+    assert ttl_cache.get_or_load('key', lambda: 'fresh') == 'fresh'
+    assert ttl_cache.get('key') == 'fresh'
+
+
+def test_invalidate_on_write(engine):
+    ttl_cache = cache.TTLCache(ttl=10)
+    cache.invalidate_on_write(ttl_cache, ['teams'])
+
+    ttl_cache.set('key', 'value')
+    with engine.connect() as db_conn:
+        db_conn.execute(models.COMPONENTS.update().where(
+            models.COMPONENTS.c.name == 'unknown').values(name='unknown'))
+        assert ttl_cache.get('key') == 'value'
+        db_conn.execute(models.TEAMS.update().where(
+            models.TEAMS.c.name == 'unknown').values(name='unknown'))
+    assert ttl_cache.get('key') is None
@@ -682,17 +682,23 @@ class TestArgs(object):
     data = {
         'limit': '50',
         'offset': '10',
+        'cursor': 'WyIyMDE3LTAxLTAxIl0=',
+        'count': 'estimate',
         'sort': 'field_1,field_2',
         'where': 'field_1:value_1,field_2:value_2',
-        'embed': 'resource_1,resource_2'
+        'embed': 'resource_1,resource_2',
+        'fields': 'field_1,resource_1.field_2'
     }
 
     data_expected = {
         'limit': 50,
         'offset': 10,
+        'cursor': 'WyIyMDE3LTAxLTAxIl0=',
+        'count': 'estimate',
         'sort': ['field_1', 'field_2'],
         'where': ['field_1:value_1', 'field_2:value_2'],
-        'embed': ['resource_1', 'resource_2']
+        'embed': ['resource_1', 'resource_2'],
+        'fields': ['field_1', 'resource_1.field_2']
     }
 
     def test_extra_args(self):
@@ -703,19 +709,23 @@ class TestArgs(object):
         expected = {
             'limit': None,
             'offset': None,
+            'cursor': None,
+            'count': 'exact',
             'sort': [],
             'where': [],
-            'embed': []
+            'embed': [],
+            'fields': []
         }
         assert schemas.args({}) == expected
 
     def test_invalid_args(self):
         errors = {'limit': schemas.INVALID_LIMIT,
-                  'offset': schemas.INVALID_OFFSET}
+                  'offset': schemas.INVALID_OFFSET,
+                  'count': schemas.INVALID_COUNT}
 
-        data = {'limit': -1, 'offset': -1}
+        data = {'limit': -1, 'offset': -1, 'count': 'all'}
         utils.invalid_args(data, errors)
-        data = {'limit': 'foo', 'offset': 'bar'}
+        data = {'limit': 'foo', 'offset': 'bar', 'count': 'foo'}
         utils.invalid_args(data, errors)
 
     def test_args(self):
@@ -17,6 +17,7 @@
 import alembic.autogenerate
 import alembic.environment
 import alembic.script
+import mock
 
 import dci.alembic.utils
 import dci.db.models as models
@@ -30,8 +31,8 @@ def test_cors_preflight(admin):
     resp = admin.options('/api/v1', headers=headers)
     headers = resp.headers
 
-    allowed_headers = ('Authorization, Content-Type, If-Match, ETag, '
-                       'X-Requested-With')
+    allowed_headers = ('Authorization, Content-Type, If-Match, '
+                       'If-None-Match, ETag, X-Requested-With')
 
     assert resp.status_code == 200
     assert headers['Access-Control-Allow-Headers'] == allowed_headers
@@ -66,3 +67,17 @@ def test_db_migration(engine, delete_db):
         )
 
     assert diff == []
+
+
+def test_server_timing_header(admin):
+    resp = admin.get('/api/v1/jobs')
+    server_timing = resp.headers['Server-Timing']
+    assert server_timing.startswith('db;dur=')
+    assert 'total;dur=' in server_timing
+
+
+def test_reload_config(app):
+    conf = {'SLOW_REQUEST_THRESHOLD': 42}
+    with mock.patch('dci.dci_config.generate_conf', return_value=conf):
+        app.reload_config()
+    assert app.config['SLOW_REQUEST_THRESHOLD'] == 42
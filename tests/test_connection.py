@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci.api.v1 import utils as v1_utils
+from dci.common import exceptions as dci_exc
+from dci.db import connection
+from dci.db import models
+
+import mock
+import pytest
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import sql
+
+
+def test_pool_exhausted_fails_fast():
+    engine = mock.Mock()
+    engine.connect.side_effect = sa_exc.TimeoutError()
+    provider = connection.ConnectionProvider(engine)
+
+    with pytest.raises(dci_exc.DCIException) as exc_info:
+        provider.connect()
+    assert exc_info.value.status_code == 503
+
+
+def test_backoff_after_connection_failure():
+    engine = mock.Mock()
+    engine.connect.side_effect = sa_exc.OperationalError('', {}, None)
+    provider = connection.ConnectionProvider(engine, backoff=60)
+
+    for _ in range(3):
+        with pytest.raises(dci_exc.DCIException) as exc_info:
+            provider.connect()
+        assert exc_info.value.status_code == 503
+    # the database is not hammered while the backoff delay runs
+    assert engine.connect.call_count == 1
+
+
+def test_successful_connection_resets_backoff():
+    engine = mock.Mock()
+    provider = connection.ConnectionProvider(engine)
+    provider._failures = 3
+    provider._retry_at = 0
+
+    assert provider.connect() == engine.connect.return_value
+    assert provider._failures == 0
+
+
+def test_db_conn_is_lazy(app):
+    with mock.patch.object(app.db_provider, 'connect') as m_connect:
+        with app.test_request_context('/api/v1'):
+            app.preprocess_request()
+            assert not m_connect.called
+            assert app.app_ctx_globals_class.__name__ == 'DciAppCtxGlobals'
+
+
+def test_options_does_not_checkout_connection(app):
+    client = app.test_client()
+    with mock.patch.object(app.db_provider, 'connect') as m_connect:
+        resp = client.options('/api/v1/jobs')
+        assert resp.status_code == 200
+        assert not m_connect.called
+
+
+def _routing_provider():
+    primary = mock.Mock()
+    replica = mock.Mock()
+    provider = connection.ConnectionProvider(primary, [replica])
+    return provider, primary, replica
+
+
+def test_write_requests_use_primary():
+    provider, primary, replica = _routing_provider()
+
+    assert provider.connect_for_request('POST') == \
+        primary.connect.return_value
+    assert not replica.connect.called
+
+
+def test_reads_go_to_replica_until_write():
+    provider, primary, replica = _routing_provider()
+    db_conn = provider.connect_for_request('GET')
+
+    db_conn.execute(sql.select([models.TEAMS]))
+    assert replica.connect.return_value.execute.call_count == 1
+    assert not primary.connect.called
+
+    db_conn.execute(models.TEAMS.insert().values(name='foo'))
+    db_conn.execute(sql.select([models.TEAMS]))
+    assert primary.connect.return_value.execute.call_count == 2
+    assert replica.connect.return_value.execute.call_count == 1
+
+    db_conn.close()
+    assert primary.connect.return_value.close.called
+    assert replica.connect.return_value.close.called
+
+
+def test_explain_goes_to_replica():
+    provider, primary, replica = _routing_provider()
+    db_conn = provider.connect_for_request('GET')
+
+    db_conn.execute(v1_utils._Explain(sql.select([models.TEAMS])))
+    assert replica.connect.return_value.execute.call_count == 1
+    assert not primary.connect.called
+
+
+def test_transaction_sticks_to_primary():
+    provider, primary, replica = _routing_provider()
+    db_conn = provider.connect_for_request('GET')
+
+    db_conn.begin()
+    db_conn.execute(sql.select([models.TEAMS]))
+    assert primary.connect.return_value.execute.call_count == 1
+    assert not replica.connect.called
+
+
+def test_unreachable_replica_falls_back_to_primary():
+    provider, primary, replica = _routing_provider()
+    replica.connect.side_effect = sa_exc.OperationalError('', {}, None)
+    db_conn = provider.connect_for_request('GET')
+
+    db_conn.execute(sql.select([models.TEAMS]))
+    assert primary.connect.return_value.execute.call_count == 1
+
+
+def test_execution_options_follow_the_routing():
+    provider, primary, replica = _routing_provider()
+    db_conn = provider.connect_for_request('GET')
+
+    assert (db_conn.execution_options(stream_results=True) ==
+            replica.connect.return_value.execution_options.return_value)
+    assert not primary.connect.called
+
+    db_conn.execute(models.TEAMS.insert().values(name='foo'))
+    assert (db_conn.execution_options(stream_results=True) ==
+            primary.connect.return_value.execution_options.return_value)
+
+
+def test_streamed_listing_with_replica(app, admin, job_user_id):
+    engine = app.db_provider.engine
+    app.db_provider = connection.ConnectionProvider(
+        engine, replica_engines=[engine])
+    app.config['STREAM_BATCH_SIZE'] = 1
+
+    jobs = admin.get('/api/v1/jobs')
+    assert jobs.status_code == 200
+    assert [job['id'] for job in jobs.data['jobs']] == [job_user_id]
+    assert jobs.data['_meta']['count'] == 1
@@ -121,3 +121,37 @@ def test_ensure_any_parent_team_member_has_access_to_subteam():
     assert user.team['id'] == 'abc'
     assert user.team['parent_id'] is None
     assert len(user.partner_teams) == 1
+
+
+def test_has_permission():
+    user = {'role_label': 'USER', 'team_id': 'abc'}
+    teams = [{'id': 'abc', 'parent_id': None}]
+
+    user = Identity(user, teams, frozenset(['CREATE_JOB']))
+    assert user.has_permission('CREATE_JOB')
+    assert not user.has_permission('DELETE_JOB')
+
+
+def test_partner_teams_include_all_the_sub_teams():
+    user = {'role_label': 'PRODUCT_OWNER', 'team_id': 'abc'}
+    teams = [
+        {'id': 'abc', 'parent_id': None},
+        {'id': 'def', 'parent_id': 'abc'},
+        {'id': 'ghi', 'parent_id': 'def'},
+        {'id': 'jkl', 'parent_id': None}
+    ]
+
+    user = Identity(user, teams)
+    assert user.is_member_of({'id': 'ghi'})
+    assert not user.is_member_of({'id': 'jkl'})
+    assert len(user.partner_teams) == 2
+
+
+def test_teamless_user_has_the_root_teams_as_partner_teams():
+    user = {'role_label': 'USER', 'team_id': None}
+    teams = [{'id': 'abc', 'parent_id': None},
+             {'id': 'def', 'parent_id': 'abc'}]
+
+    user = Identity(user, teams)
+    assert user.team is None
+    assert [team['id'] for team in user.partner_teams] == ['abc']
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci.db import models
+from dci.db import statements
+
+import mock
+from sqlalchemy import sql
+
+
+def test_cached_builds_the_statement_once():
+    builder = mock.Mock(side_effect=lambda: sql.select([models.TEAMS]))
+
+    first = statements.cached('test_cached_once', builder)
+    second = statements.cached('test_cached_once', builder)
+
+    assert first is second
+    assert builder.call_count == 1
+
+
+def test_compiled_cache_only_keeps_cached_statements():
+    cache = statements.CompiledCache()
+    cached = statements.cached('test_compiled_cache',
+                               lambda: sql.select([models.TEAMS]))
+    ad_hoc = sql.select([models.TEAMS])
+
+    cache[(None, ad_hoc, (), False)] = 'ad hoc'
+    cache[(None, cached, (), False)] = 'cached'
+
+    assert cache.get((None, ad_hoc, (), False)) is None
+    assert cache.get((None, cached, (), False)) == 'cached'
+    assert len(cache) == 1
+
+
+def test_cached_statements_are_reused(engine):
+    query = statements.cached(
+        'test_reused',
+        lambda: sql.select([models.TEAMS.c.id]).where(
+            models.TEAMS.c.name == sql.bindparam('name')))
+    statements.COMPILED_CACHE.clear()
+
+    with engine.connect() as db_conn:
+        db_conn = db_conn.execution_options(
+            compiled_cache=statements.COMPILED_CACHE)
+        db_conn.execute(query, name='admin').fetchall()
+        size = len(statements.COMPILED_CACHE)
+        db_conn.execute(query, name='user').fetchall()
+
+    assert size == 1
+    assert len(statements.COMPILED_CACHE) == size
+
+
+def test_cached_shape_forgets_the_least_recently_used_statement():
+    statements.COMPILED_CACHE.clear()
+    first = statements.cached_shape(('test_shape', 1),
+                                    lambda: sql.select([models.TEAMS]), 2)
+    second = statements.cached_shape(('test_shape', 2),
+                                     lambda: sql.select([models.TEAMS]), 2)
+    statements.COMPILED_CACHE[(None, second, (), False)] = 'second'
+
+    assert statements.cached_shape(('test_shape', 1), None, 2) is first
+    third = statements.cached_shape(('test_shape', 3),
+                                    lambda: sql.select([models.TEAMS]), 2)
+
+    assert statements.cached_shape(('test_shape', 1), None, 2) is first
+    assert statements.cached_shape(('test_shape', 3), None, 2) is third
+    assert statements.COMPILED_CACHE.get((None, second, (), False)) is None
+    assert statements.cached_shape(
+        ('test_shape', 2), lambda: sql.select([models.TEAMS]), 2) is not second
+
+
+def test_query_shape_does_not_depend_on_the_values(app):
+    from dci.api.v1 import utils as v1_utils
+
+    with app.test_request_context('/api/v1'):
+        queries = []
+        for names in (['a', 'b'], ['c', 'd', 'e']):
+            query = v1_utils.QueryBuilder(models.TEAMS)
+            query.add_extra_condition(models.TEAMS.c.name.in_(names))
+            query.add_extra_condition(models.TEAMS.c.state != 'archived')
+            queries.append((query.get_query(), query._params))
+
+    (first, first_params), (second, second_params) = queries
+    assert first is second
+    assert first_params == {'_p0': ['a', 'b'], '_p1': 'archived'}
+    assert second_params == {'_p0': ['c', 'd', 'e'], '_p1': 'archived'}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci.stores import swift
+
+import mock
+import six
+
+
+def _store(**conf):
+    store = swift.Swift(dict(container='files', **conf))
+    store.get_connection = mock.Mock(side_effect=lambda: mock.Mock(
+        token=None, get_auth=mock.Mock(return_value=('url', 'token'))))
+    return store
+
+
+def test_connections_are_reused():
+    store = _store()
+
+    store.head('a')
+    store.head('b')
+
+    assert store.get_connection.call_count == 1
+
+
+def test_token_is_shared_until_it_expires():
+    store = _store(token_ttl=0)
+    first = store._acquire()
+    second = store._acquire()
+
+    assert first.get_auth.call_count == 1
+    assert second.get_auth.call_count == 1
+
+    store = _store(token_ttl=3600)
+    first = store._acquire()
+    second = store._acquire()
+
+    assert first.get_auth.call_count == 1
+    assert second.get_auth.call_count == 0
+    assert second.token == 'token'
+
+
+def test_container_existence_is_remembered():
+    store = _store()
+
+    store.upload('a', b'content')
+    store.upload('b', b'content')
+
+    connection = store._pool.get_nowait()
+    assert connection.head_container.call_count == 1
+    assert connection.put_object.call_count == 2
+
+
+def test_get_releases_the_connection_once_read():
+    store = _store()
+    connection = store._acquire()
+    connection.get_object.return_value = ({}, six.BytesIO(b'content'))
+    store._release(connection)
+
+    _, body = store.get('a')
+    assert store._pool.empty()
+    assert body.read() == b'content'
+    assert store._pool.get_nowait() is connection